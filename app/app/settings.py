@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     "rest_framework",
     "rest_framework.authtoken",
@@ -56,10 +58,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -88,14 +92,171 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections persist for DB_CONN_MAX_AGE seconds and are health checked
+# on first use in each request. With DB_POOL=1 they are instead checked
+# out of an in-process pool per request, for threaded or async workers.
+
+DB_POOL = bool(int(os.environ.get("DB_POOL", 0)))
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "core.backends.postgresql",
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        "CONN_MAX_AGE": (
+            0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": bool(
+            int(os.environ.get("DB_CONN_HEALTH_CHECKS", 1))
+        ),
+        "POOL": {
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+            "max_lifetime": float(
+                os.environ.get("DB_POOL_MAX_LIFETIME", 1800)
+            ),
+        }
+        if DB_POOL
+        else None,
+    }
+}
+
+# Read replicas, one per host in DB_REPLICA_HOSTS. Safe requests read
+# from them; a user who just wrote reads from the primary for
+# DB_REPLICA_PIN_SECONDS so they always see their own changes. Users and
+# tokens are always read from the primary, a freshly created account or
+# token may not have reached the replicas yet.
+
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(","))
+):
+    _alias = f"replica_{_index}"
+    DATABASES[_alias] = {
+        **DATABASES["default"],
+        "HOST": _host,
+        "TEST": {"MIRROR": "default"},
     }
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+DB_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", 5))
+DB_REPLICA_PIN_CACHE_ALIAS = "replica_pins"
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    },
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+    },
+    # Read-your-writes pins, see DB_REPLICA_HOSTS. Must be shared by all
+    # worker processes (e.g. Redis or memcached) when replicas are used,
+    # otherwise a worker that did not handle the write reads a replica.
+    "replica_pins": {
+        "BACKEND": os.environ.get(
+            "DB_REPLICA_PIN_CACHE_BACKEND",
+            os.environ.get(
+                "CACHE_BACKEND",
+                "django.core.cache.backends.locmem.LocMemCache",
+            ),
+        ),
+        "LOCATION": os.environ.get(
+            "DB_REPLICA_PIN_CACHE_LOCATION",
+            os.environ.get("CACHE_LOCATION", "replica_pins"),
+        ),
+    },
+}
+
+API_CACHE_ALIAS = os.environ.get("API_CACHE_ALIAS", "default")
+API_CACHE_TIMEOUT = int(os.environ.get("API_CACHE_TIMEOUT", 300))
+
+# Token authentication cache: a process-local LRU. With several worker
+# processes set TOKEN_CACHE_ALIAS to a shared cache (e.g. Redis), it
+# holds per-token versions so revoked tokens are rejected everywhere at
+# once instead of after TOKEN_CACHE_TTL seconds.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_ALIAS = os.environ.get("TOKEN_CACHE_ALIAS") or None
+
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", 1000))
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 2000))
+
+# Upper bounds of the price buckets reported by the recipe stats action.
+RECIPE_STATS_PRICE_EDGES = [
+    int(edge)
+    for edge in os.environ.get(
+        "RECIPE_STATS_PRICE_EDGES", "5,10,20,50"
+    ).split(",")
+]
+RECIPE_STATS_MAX_TOP = int(os.environ.get("RECIPE_STATS_MAX_TOP", 50))
+AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get("AUTOCOMPLETE_MAX_LIMIT", 50))
+
+# Responses of these types are compressed with Brotli (when brotli is
+# installed and the client accepts it) or gzip once they reach
+# COMPRESSION_MIN_SIZE bytes. HTML stays uncompressed: browsable API
+# pages carry CSRF tokens next to echoed input (BREACH).
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_CONTENT_TYPES = os.environ.get(
+    "COMPRESSION_CONTENT_TYPES",
+    "application/json,application/msgpack,application/x-ndjson,"
+    "application/vnd.oai.openapi,text/csv",
+).split(",")
+COMPRESSION_BROTLI_QUALITY = int(
+    os.environ.get("COMPRESSION_BROTLI_QUALITY", 4)
+)
+# Streamed Brotli bodies are flushed to the client every this many bytes.
+COMPRESSION_STREAM_FLUSH_SIZE = int(
+    os.environ.get("COMPRESSION_STREAM_FLUSH_SIZE", 64 * 1024)
+)
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/3.2/topics/auth/passwords/
+# PASSWORD_HASHER picks the hasher for new hashes ("argon2" needs
+# argon2-cffi, "bcrypt" needs bcrypt); the others still verify old ones
+# and a login with an outdated hash rehashes it.
+
+_PASSWORD_HASHERS = {
+    "pbkdf2": "user.hashers.PBKDF2PasswordHasher",
+    "argon2": "user.hashers.Argon2PasswordHasher",
+    "bcrypt": "user.hashers.BCryptSHA256PasswordHasher",
+}
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "pbkdf2")
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher
+    for name, hasher in _PASSWORD_HASHERS.items()
+    if name != PASSWORD_HASHER
+]
+PASSWORD_HASHERS.append("django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher")
+
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.environ.get("PASSWORD_PBKDF2_ITERATIONS", 260000)
+)
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.environ.get("PASSWORD_ARGON2_MEMORY_COST", 102400)
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.environ.get("PASSWORD_ARGON2_PARALLELISM", 8)
+)
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get("PASSWORD_BCRYPT_ROUNDS", 12))
+
+LOGIN_THROTTLE_CACHE_ALIAS = "throttle"
+LOGIN_THROTTLE_RATES = {
+    "login_ip": os.environ.get("LOGIN_THROTTLE_IP_RATE", "30/min"),
+    "login_email": os.environ.get("LOGIN_THROTTLE_EMAIL_RATE", "10/min"),
 }
 
 
@@ -144,14 +305,52 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "core.User"
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson backed JSON, falling back to the stdlib without orjson.
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# application/msgpack is only negotiated when msgpack is installed, or
+# clients asking for it would get a server error instead of JSON.
+if find_spec("msgpack") is not None:
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"].insert(
+        1, "core.renderers.MessagePackRenderer"
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"].insert(
+        1, "core.parsers.MessagePackParser"
+    )
+
 STATIC_URL = "/static/static/"
 MEDIA_URL = "/static/media/"
 
 STATIC_ROOT = "/vol/web/static"
 MEDIA_ROOT = "/vol/web/media"
 
+# "uuid" stores every upload under a random name, "content" stores it
+# under its SHA-256 digest so identical files are kept once.
+IMAGE_STORAGE_MODE = os.environ.get("IMAGE_STORAGE_MODE", "uuid")
+
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.environ.get("MAX_IMAGE_UPLOAD_SIZE", 10 * 1024 * 1024)
+)
+MAX_IMAGE_DIMENSION = int(os.environ.get("MAX_IMAGE_DIMENSION", 8000))
+MAX_IMAGE_PIXELS = int(os.environ.get("MAX_IMAGE_PIXELS", 40_000_000))
+
+IMAGE_VARIANTS = {
+    "thumbnail": (200, 200),
+    "medium": (800, 800),
+}
+IMAGE_VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_VARIANT_BACKEND = os.environ.get("IMAGE_VARIANT_BACKEND", "thread")
+IMAGE_VARIANT_WORKERS = int(os.environ.get("IMAGE_VARIANT_WORKERS", 2))
+
 SEPCTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
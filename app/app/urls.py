@@ -20,6 +20,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import DatabasePoolStatsView
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -31,6 +33,11 @@ urlpatterns = [
     ),
     path("api/user/", include("user.urls")),
     path("api/recipes/", include("recipe.urls")),
+    path(
+        "api/health/db-pool",
+        DatabasePoolStatsView.as_view(),
+        name="db-pool-stats",
+    ),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,74 @@
+"""
+PostgreSQL backend adding connection health checks and optional pooling.
+"""
+
+from django.db.backends.postgresql import base
+
+from core.backends.postgresql.creation import DatabaseCreation
+from core.backends.postgresql.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Django's PostgreSQL wrapper with two settings-driven extras.
+
+    CONN_HEALTH_CHECKS: a persistent connection is checked with a cheap
+    query the first time it is used in each request and replaced if the
+    server dropped it.
+
+    POOL: a dict of ConnectionPool options. When set, connections are
+    checked out of a process-wide pool and returned to it on close.
+    """
+
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._health_check_pending = False
+        self._pool = None
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get("POOL")
+        if not options:
+            return super().get_new_connection(conn_params)
+
+        def factory():
+            return super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+
+        key = (self.alias, conn_params.get("database"))
+        self._pool = get_pool(
+            key,
+            factory,
+            health_check=self.settings_dict.get("CONN_HEALTH_CHECKS", False),
+            **options,
+        )
+        connection = self._pool.checkout()
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self._pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self._pool.checkin(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self._health_check_pending = (
+            self.connection is not None
+            and self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+        )
+
+    def ensure_connection(self):
+        if self._health_check_pending:
+            self._health_check_pending = False
+            if (
+                self.connection is not None
+                and not self.in_atomic_block
+                and not self.is_usable()
+            ):
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,182 @@
+"""
+A small thread-safe pool of raw psycopg2 connections.
+"""
+
+import threading
+import time
+from collections import deque
+
+import psycopg2
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded LIFO pool handing out raw DB-API connections.
+
+    Connections that are closed, older than max_lifetime or, with
+    health_check enabled, fail a ``SELECT 1`` are replaced on checkout.
+    Counters for checkouts, waits, timeouts and reconnects are kept for
+    monitoring.
+    """
+
+    def __init__(
+        self,
+        factory,
+        max_size=10,
+        timeout=30.0,
+        max_lifetime=None,
+        health_check=False,
+    ):
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check = health_check
+        self._idle = deque()
+        self._born = {}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._counters = {
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "connections_created": 0,
+        }
+
+    def checkout(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._counters["checkouts"] += 1
+            waited = False
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection available after "
+                        f"{self.timeout} seconds."
+                    )
+                if not waited:
+                    self._counters["waits"] += 1
+                    waited = True
+                self._cond.wait(remaining)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._size += 1
+
+        if conn is not None and not self._usable(conn):
+            self._close_quietly(conn)
+            conn = None
+            with self._cond:
+                self._counters["reconnects"] += 1
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._born[id(conn)] = time.monotonic()
+                self._counters["connections_created"] += 1
+        return conn
+
+    def checkin(self, conn):
+        """Return a connection, rolling back any open transaction."""
+        if not conn.closed and not self._expired(conn):
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                pass
+            else:
+                with self._cond:
+                    self._idle.append(conn)
+                    self._cond.notify()
+                return
+        self.discard(conn)
+
+    def discard(self, conn):
+        """Close a checked out connection and free its slot."""
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self.discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                **self._counters,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+    def _expired(self, conn):
+        if self.max_lifetime is None:
+            return False
+        born = self._born.get(id(conn), time.monotonic())
+        return time.monotonic() - born > self.max_lifetime
+
+    def _usable(self, conn):
+        if conn.closed or self._expired(conn):
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _close_quietly(self, conn):
+        with self._cond:
+            self._born.pop(id(conn), None)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory, **options):
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(factory, **options)
+        return pool
+
+
+def pool_stats():
+    """Return {alias/database: stats} for every pool in this process."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {f"{key[0]}/{key[1]}": pool.stats() for key, pool in pools.items()}
+
+
+def close_pools(database):
+    """Close the idle connections of every pool for the database."""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[1] == database]
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,30 @@
+"""
+System checks for deployment settings.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """Warn when read-your-writes pins would not be seen by other workers."""
+    alias = settings.DB_REPLICA_PIN_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if settings.DATABASE_REPLICAS and backend in PROCESS_LOCAL_CACHES:
+        return [
+            checks.Warning(
+                f"Cache {alias!r} is local to each process, other workers "
+                "will not see read-your-writes pins and may read stale "
+                "data from a replica.",
+                hint="Point DB_REPLICA_PIN_CACHE_BACKEND at a shared "
+                "cache such as Redis or memcached.",
+                id="core.W001",
+            )
+        ]
+    return []
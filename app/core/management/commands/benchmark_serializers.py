@@ -0,0 +1,138 @@
+"""
+Django command comparing DRF and compiled recipe serialization speed.
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.serializers import Serializer
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import RecipeSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the recipe list serializer against DRF's generic "
+        "to_representation on throwaway data, rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=2000,
+            help="Number of recipes rendered per run.",
+        )
+        parser.add_argument(
+            "--tags",
+            type=int,
+            default=3,
+            help="Tags and ingredients linked to each recipe.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per serializer, the fastest one is reported.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        try:
+            with transaction.atomic():
+                self._benchmark(**options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _create_recipes(self, count, tags_per_recipe):
+        user = get_user_model().objects.create_user(
+            "benchmark@example.com", None
+        )
+        tags = Tag.objects.bulk_create(
+            [Tag(user=user, name=f"tag{i}") for i in range(20)]
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            [Ingredient(user=user, name=f"ingredient{i}") for i in range(20)]
+        )
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    user=user,
+                    title=f"Recipe {i}",
+                    time_minutes=i % 120,
+                    price=Decimal(i % 10000) / 100,
+                    link=f"https://example.com/{i}",
+                )
+                for i in range(count)
+            ]
+        )
+        for field, attrs in (("tags", tags), ("ingredients", ingredients)):
+            m2m = Recipe._meta.get_field(field)
+            through = m2m.remote_field.through
+            through.objects.bulk_create(
+                through(
+                    **{
+                        m2m.m2m_column_name(): recipe.id,
+                        m2m.m2m_reverse_name(): attrs[(i + j) % 20].id,
+                    }
+                )
+                for i, recipe in enumerate(recipes)
+                for j in range(tags_per_recipe)
+            )
+        return user
+
+    def _time(self, render, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = JSONRenderer().render(render())
+            best = min(best, time.perf_counter() - started)
+        return best, body
+
+    def _benchmark(self, recipes, tags, repeat, **options):
+        if recipes < 1 or repeat < 1:
+            raise CommandError("--recipes and --repeat must be positive.")
+        user = self._create_recipes(recipes, tags)
+        columns = RecipeSerializer.model_columns(RecipeSerializer.Meta.fields)
+        rows = list(
+            Recipe.objects.filter(user=user)
+            .order_by("-id")
+            .only(*columns)
+            .prefetch_related("tags", "ingredients")
+        )
+        request = Request(RequestFactory().get("/api/recipe/recipes/"))
+
+        def drf():
+            child = RecipeSerializer(context={"request": request})
+            return [Serializer.to_representation(child, row) for row in rows]
+
+        def compiled():
+            return RecipeSerializer(
+                rows, many=True, context={"request": request}
+            ).data
+
+        drf_time, drf_body = self._time(drf, repeat)
+        compiled_time, compiled_body = self._time(compiled, repeat)
+        if drf_body != compiled_body:
+            raise CommandError("Compiled output differs from DRF output.")
+
+        self.stdout.write(f"{recipes} recipes, best of {repeat} runs:")
+        self.stdout.write(f"  DRF:      {drf_time * 1000:8.1f} ms")
+        self.stdout.write(f"  compiled: {compiled_time * 1000:8.1f} ms")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Identical output, {drf_time / compiled_time:.1f}x faster."
+            )
+        )
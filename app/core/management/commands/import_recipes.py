@@ -0,0 +1,245 @@
+"""
+Django command to bulk import recipes from an NDJSON or CSV file.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import update_search_vectors
+
+RECIPE_FIELDS = ["title", "description", "time_minutes", "price", "link"]
+ATTR_MODELS = {"tags": Tag, "ingredients": Ingredient}
+CSV_SEPARATOR = "|"
+
+
+def _read_ndjson(handle):
+    """Yield decoded lines, or a ValidationError for malformed ones."""
+    for line in handle:
+        line = line.strip()
+        if not line:
+            yield None
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ValidationError(f"Invalid JSON: {exc}")
+
+
+def _read_csv(handle):
+    for row in csv.DictReader(handle):
+        for field in ATTR_MODELS:
+            names = row.get(field) or ""
+            row[field] = [name for name in names.split(CSV_SEPARATOR) if name]
+        yield row
+
+
+def _attr_names(field, items):
+    """Return the distinct, validated names of a row's tags/ingredients.
+
+    items must be a list of names or of {"name": name} objects.
+    """
+    if items is None:
+        return []
+    if not isinstance(items, list):
+        raise ValidationError(f"{field}: Expected a list of names.")
+    model_field = ATTR_MODELS[field]._meta.get_field("name")
+    names = []
+    for item in items:
+        name = item.get("name") if isinstance(item, dict) else item
+        if not isinstance(name, str):
+            raise ValidationError(f"{field}: Expected a list of names.")
+        try:
+            names.append(model_field.clean(name, None))
+        except ValidationError as exc:
+            raise ValidationError(
+                [f"{field}: {message}" for message in exc.messages]
+            )
+    return list(dict.fromkeys(names))
+
+
+class Command(BaseCommand):
+    help = "Stream recipes from an NDJSON or CSV file into the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON or CSV file to import.")
+        parser.add_argument(
+            "--user",
+            required=True,
+            help="Email of the user owning the imported recipes.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=["ndjson", "csv"],
+            help="Input format, guessed from the file extension if omitted.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows written per transaction.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="File recording progress, import resumes from it if present.",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        user = get_user_model().objects.filter(email=options["user"]).first()
+        if user is None:
+            raise CommandError(f"User {options['user']} does not exist.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        fmt = options["format"] or (
+            "csv" if options["path"].endswith(".csv") else "ndjson"
+        )
+        checkpoint = options["checkpoint"]
+        done = self._load_checkpoint(checkpoint)
+        # Keyed by the database's lower(name), which is what the unique
+        # index compares and may differ from str.lower().
+        attr_ids = {
+            field: dict(
+                model.objects.filter(user=user)
+                .annotate(lower_name=Lower("name"))
+                .values_list("lower_name", "id")
+            )
+            for field, model in ATTR_MODELS.items()
+        }
+
+        reader = _read_csv if fmt == "csv" else _read_ndjson
+        imported = skipped = 0
+        started = time.monotonic()
+        with open(options["path"], newline="", encoding="utf-8") as handle:
+            rows = islice(reader(handle), done, None)
+            while True:
+                batch = list(islice(rows, options["batch_size"]))
+                if not batch:
+                    break
+                written = self._write_batch(user, batch, done, attr_ids)
+                imported += written
+                skipped += len(batch) - written
+                done += len(batch)
+                self._save_checkpoint(checkpoint, done)
+                rate = imported / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(
+                    f"Imported {imported} rows, skipped {skipped} "
+                    f"({rate:.0f} rows/s)"
+                )
+
+        self._invalidate_cache(user)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Import finished: {imported} imported, {skipped} skipped."
+            )
+        )
+
+    def _clean(self, row):
+        data = {}
+        for name in RECIPE_FIELDS:
+            field = Recipe._meta.get_field(name)
+            value = row.get(name)
+            if value is None and field.blank:
+                value = ""
+            data[name] = field.clean(value, None)
+        return data
+
+    def _write_batch(self, user, batch, offset, attr_ids):
+        recipes = []
+        links = []
+        for line, row in enumerate(batch, start=offset + 1):
+            if row is None:
+                continue
+            try:
+                if isinstance(row, ValidationError):
+                    raise row
+                if not isinstance(row, dict):
+                    raise ValidationError("Expected a JSON object.")
+                recipe = Recipe(user=user, **self._clean(row))
+                names = {f: _attr_names(f, row.get(f)) for f in ATTR_MODELS}
+            except ValidationError as exc:
+                self.stderr.write(f"Row {line} skipped: {exc.messages}")
+                continue
+            recipes.append(recipe)
+            links.append(names)
+
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            for field, model in ATTR_MODELS.items():
+                ids = attr_ids[field]
+                keys = self._create_attrs(user, model, ids, links, field)
+                pairs = {
+                    (recipe.id, ids[keys[name]])
+                    for recipe, names in zip(recipes, links)
+                    for name in names[field]
+                }
+                self._insert_links(field, pairs)
+            update_search_vectors(
+                Recipe.objects.filter(id__in=[r.id for r in recipes])
+            )
+        return len(recipes)
+
+    def _create_attrs(self, user, model, ids, links, field):
+        """Create unknown names and record their ids in the name map.
+
+        Returns {name: key} mapping the batch's names to keys of ids.
+        """
+        keys = model.objects.lower_names(
+            name for names in links for name in names[field]
+        )
+        missing = [name for name, key in keys.items() if key not in ids]
+        if missing:
+            found = model.objects.get_or_create_names(user, missing)
+            ids.update((keys[name], obj.id) for name, obj in found.items())
+        return keys
+
+    def _insert_links(self, field, pairs):
+        if not pairs:
+            return
+        m2m = Recipe._meta.get_field(field)
+        through = m2m.remote_field.through
+        source, target = m2m.m2m_column_name(), m2m.m2m_reverse_name()
+        if connection.vendor != "postgresql":
+            through.objects.bulk_create(
+                [through(**{source: a, target: b}) for a, b in pairs],
+                ignore_conflicts=True,
+            )
+            return
+        buffer = io.StringIO("".join(f"{a}\t{b}\n" for a, b in pairs))
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {through._meta.db_table} ({source}, {target}) "
+                f"FROM STDIN",
+                buffer,
+            )
+
+    def _load_checkpoint(self, path):
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as handle:
+            done = json.load(handle)["rows"]
+        self.stdout.write(f"Resuming after {done} rows.")
+        return done
+
+    def _save_checkpoint(self, path, done):
+        if not path:
+            return
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump({"rows": done}, handle)
+        os.replace(tmp_path, path)
+
+    def _invalidate_cache(self, user):
+        from recipe.cache import invalidate_user
+
+        invalidate_user(user.pk)
@@ -0,0 +1,165 @@
+"""
+Middleware for request-scoped database routing and response compression.
+"""
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from core import routers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class ReadYourWritesMiddleware:
+    """Expose the request to the replica router and pin writers.
+
+    After a successful unsafe request by an authenticated user, that
+    user's reads stay on the primary for a few seconds so they never
+    read a replica that has not caught up with their own write yet.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request(request)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            routers.end_request()
+            raise
+        if response.streaming:
+            # Streaming bodies are rendered after we return, keep routing
+            # them like the request until the response is closed.
+            response._resource_closers.append(routers.end_request)
+        else:
+            routers.end_request()
+
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in routers.SAFE_METHODS
+            and response.status_code < 400
+        ):
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                routers.pin_user(user.pk)
+        return response
+
+
+def accepted_encodings(header):
+    """Return the codings of an Accept-Encoding header not refused by q=0."""
+    codings = set()
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    refused = float(value) == 0
+                except ValueError:
+                    refused = True
+                if refused:
+                    break
+        else:
+            if coding:
+                codings.add(coding.lower())
+    return codings
+
+
+def _brotli_sequence(sequence, quality, flush_size):
+    """Compress a byte sequence, flushing every flush_size input bytes.
+
+    Flushing after every small chunk such as an export row costs most of
+    the compression, so rows are flushed in batches instead.
+    """
+    compressor = brotli.Compressor(quality=quality)
+    pending = 0
+    for item in sequence:
+        data = compressor.process(item)
+        pending += len(item)
+        if pending >= flush_size:
+            data += compressor.flush()
+            pending = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress API responses with Brotli or gzip.
+
+    Only bodies whose content type is in COMPRESSION_CONTENT_TYPES and
+    at least COMPRESSION_MIN_SIZE bytes long are compressed, small
+    payloads are not worth the CPU. Streamed bodies are compressed chunk
+    by chunk and flushed regularly, so clients still receive rows as
+    they are produced. Media under MEDIA_URL are already compressed
+    images and are passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.has_header("Content-Encoding")
+            or request.path.startswith(settings.MEDIA_URL)
+            or not response.has_header("Content-Type")
+        ):
+            return response
+        content_type = response["Content-Type"].split(";")[0].strip()
+        if content_type.lower() not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        codings = accepted_encodings(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if brotli is not None and "br" in codings:
+            coding = "br"
+        elif "gzip" in codings:
+            coding = "gzip"
+        else:
+            return response
+
+        if response.streaming:
+            if coding == "br":
+                response.streaming_content = _brotli_sequence(
+                    response.streaming_content,
+                    settings.COMPRESSION_BROTLI_QUALITY,
+                    settings.COMPRESSION_STREAM_FLUSH_SIZE,
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content
+                )
+            del response["Content-Length"]
+        else:
+            if coding == "br":
+                compressed = brotli.compress(
+                    response.content,
+                    quality=settings.COMPRESSION_BROTLI_QUALITY,
+                )
+            else:
+                compressed = compress_string(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # The compressed body differs byte for byte, so a strong ETag
+        # becomes weak, like Django's GZipMiddleware does.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = coding
+        return response
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_recipe_image"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["user", "id"], name="recipe_user_id_idx"
+            ),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS core_recipe_tags_tag_recipe_idx "
+                "ON core_recipe_tags (tag_id, recipe_id);"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS core_recipe_tags_tag_recipe_idx;",
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX IF NOT EXISTS "
+                "core_recipe_ingredients_ingredient_recipe_idx "
+                "ON core_recipe_ingredients (ingredient_id, recipe_id);"
+            ),
+            reverse_sql=(
+                "DROP INDEX IF EXISTS "
+                "core_recipe_ingredients_ingredient_recipe_idx;"
+            ),
+        ),
+    ]
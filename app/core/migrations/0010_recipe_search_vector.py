@@ -0,0 +1,61 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:15
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _names_subquery(model):
+    names = (
+        model.objects.filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(names=StringAgg("name", delimiter=" "))
+        .values("names")
+    )
+    return Coalesce(Subquery(names), Value(""))
+
+
+def populate_search_vector(apps, schema_editor):
+    # The vector as it was defined when this migration was written, kept
+    # here so later changes to core.search do not alter the migration.
+    Recipe = apps.get_model("core", "Recipe")
+    Tag = apps.get_model("core", "Tag")
+    Ingredient = apps.get_model("core", "Ingredient")
+    Recipe.objects.update(
+        search_vector=(
+            SearchVector("title", weight="A")
+            + SearchVector(_names_subquery(Tag), weight="B")
+            + SearchVector(_names_subquery(Ingredient), weight="B")
+            + SearchVector("description", weight="C")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_recipe_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="recipe_search_vector_idx"
+            ),
+        ),
+        migrations.RunPython(
+            populate_search_vector, migrations.RunPython.noop
+        ),
+    ]
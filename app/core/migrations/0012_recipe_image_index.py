@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 04:20
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                db_index=True,
+                null=True,
+                upload_to=core.models.get_image_file_path,
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:02
+
+from django.db import migrations
+
+
+def _prefix_index(table):
+    name = f"{table}_user_lower_name_idx"
+    return migrations.RunSQL(
+        sql=(
+            f"CREATE INDEX IF NOT EXISTS {name} "
+            f"ON {table} (user_id, lower(name) text_pattern_ops);"
+        ),
+        reverse_sql=f"DROP INDEX IF EXISTS {name};",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_recipe_image_index"),
+    ]
+
+    operations = [
+        _prefix_index("core_tag"),
+        _prefix_index("core_ingredient"),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:15
+
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+BATCH_SIZE = 1000
+
+ATTR_FIELDS = {"Tag": "tags", "Ingredient": "ingredients"}
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge names differing only in case into their oldest row.
+
+    Recipes linked to a duplicate are linked to the kept row instead,
+    a batch of duplicates at a time.
+    """
+    Recipe = apps.get_model("core", "Recipe")
+    for model_name, field in ATTR_FIELDS.items():
+        model = apps.get_model("core", model_name)
+        m2m = Recipe._meta.get_field(field)
+        through = m2m.remote_field.through
+        source = m2m.m2m_field_name()
+        target = m2m.m2m_reverse_field_name()
+
+        groups = (
+            model.objects.annotate(lower_name=Lower("name"))
+            .values("user_id", "lower_name")
+            .annotate(keep=Min("id"), total=Count("id"))
+            .filter(total__gt=1)
+        )
+        keep_ids = {
+            (group["user_id"], group["lower_name"]): group["keep"]
+            for group in groups
+        }
+        if not keep_ids:
+            continue
+        remap = {}
+        rows = (
+            model.objects.annotate(lower_name=Lower("name"))
+            .filter(user_id__in={user_id for user_id, _ in keep_ids})
+            .values_list("id", "user_id", "lower_name")
+        )
+        for attr_id, user_id, lower_name in rows.iterator():
+            keep = keep_ids.get((user_id, lower_name))
+            if keep is not None and keep != attr_id:
+                remap[attr_id] = keep
+
+        for batch in _batches(list(remap), BATCH_SIZE):
+            links = through.objects.filter(
+                **{f"{target}_id__in": batch}
+            ).values_list(f"{source}_id", f"{target}_id")
+            through.objects.bulk_create(
+                [
+                    through(
+                        **{
+                            f"{source}_id": recipe_id,
+                            f"{target}_id": remap[attr_id],
+                        }
+                    )
+                    for recipe_id, attr_id in links
+                ],
+                ignore_conflicts=True,
+            )
+            through.objects.filter(**{f"{target}_id__in": batch}).delete()
+            model.objects.filter(id__in=batch).delete()
+
+    # Fire the deferred FK checks now, PostgreSQL refuses to build the
+    # index below while trigger events are pending.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_attr_name_prefix_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ] + [
+        migrations.RunSQL(
+            sql=(
+                f"DROP INDEX IF EXISTS {table}_user_lower_name_idx; "
+                f"CREATE UNIQUE INDEX {table}_user_lower_name_uniq "
+                f"ON {table} (user_id, lower(name) text_pattern_ops);"
+            ),
+            reverse_sql=(
+                f"DROP INDEX IF EXISTS {table}_user_lower_name_uniq; "
+                f"CREATE INDEX {table}_user_lower_name_idx "
+                f"ON {table} (user_id, lower(name) text_pattern_ops);"
+            ),
+        )
+        for table in ("core_tag", "core_ingredient")
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import connections, models, router
+from django.db.models.functions import Lower
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
@@ -12,13 +15,29 @@ from django.conf import settings
 # Create your models here.
 
 
+CONTENT_IMAGE_DIR = os.path.join("uploads", "recipes", "cas")
+
+
 def get_image_file_path(instance, filename):
     ext = os.path.splitext(filename)[1]
+    digest = getattr(instance, "_image_content_hash", None)
+    if digest:
+        return content_image_path(digest, ext)
     filename = f"{uuid.uuid4()}{ext}"
 
     return os.path.join("uploads", "recipes", filename)
 
 
+def content_image_path(digest, ext):
+    return os.path.join(
+        CONTENT_IMAGE_DIR, digest[:2], f"{digest}{ext.lower()}"
+    )
+
+
+def is_content_addressed(name):
+    return bool(name) and name.startswith(CONTENT_IMAGE_DIR + os.sep)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -62,18 +81,119 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField("Tag")
     ingredients = models.ManyToManyField("Ingredient")
-    image = models.ImageField(null=True, upload_to=get_image_file_path)
+    image = models.ImageField(
+        null=True, db_index=True, upload_to=get_image_file_path
+    )
+    image_variants = models.JSONField(default=dict, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="recipe_user_id_idx"),
+            GinIndex(
+                fields=["search_vector"], name="recipe_search_vector_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class RecipeAttrManager(models.Manager):
+    """Manager for per-user names, unique regardless of case.
+
+    Uniqueness is enforced by a unique (user_id, lower(name)) index
+    created in migration 0014.
+    """
+
+    def lower_names(self, names, using=None):
+        """Return {name: lower(name)} as computed by the database.
+
+        Python's str.lower() differs from PostgreSQL's lower() for some
+        characters and collations, so keys compared with lower(name)
+        must come from the database.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+        connection = connections[using or router.db_for_read(self.model)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, lower(name) FROM unnest(%s::text[]) AS name",
+                [names],
+            )
+            return dict(cursor.fetchall())
+
+    def get_or_create_names(self, user, names):
+        """Return {name: obj} for names, creating missing rows.
+
+        Names differing only in case resolve to the same row. Missing
+        rows are inserted with INSERT ... ON CONFLICT DO NOTHING, so
+        concurrent callers neither duplicate rows nor fail. Rows that
+        another transaction inserted first are read back afterwards.
+        """
+        db = router.db_for_write(self.model)
+        keys = self.lower_names(names, db)
+        if not keys:
+            return {}
+        queryset = (
+            self.using(db)
+            .annotate(lower_name=Lower("name"))
+            .filter(user=user)
+        )
+        found = {
+            obj.lower_name: obj
+            for obj in queryset.filter(lower_name__in=set(keys.values()))
+        }
+        missing = {}
+        for name, key in keys.items():
+            if key not in found:
+                missing.setdefault(key, name)
+        if missing:
+            found.update(
+                self._insert_ignoring_conflicts(db, user, missing.values())
+            )
+            lost = [key for key in missing if key not in found]
+            if lost:
+                found.update(
+                    (obj.lower_name, obj)
+                    for obj in queryset.filter(lower_name__in=lost)
+                )
+        return {name: found[key] for name, key in keys.items()}
+
+    def _insert_ignoring_conflicts(self, db, user, names):
+        """Insert names, returning {lower(name): obj} for inserted rows."""
+        names = list(names)
+        meta = self.model._meta
+        connection = connections[db]
+        quote = connection.ops.quote_name
+        values = ", ".join(["(%s, %s)"] * len(names))
+        sql = (
+            f"INSERT INTO {quote(meta.db_table)} (user_id, name) "
+            f"VALUES {values} "
+            f"ON CONFLICT (user_id, lower(name)) DO NOTHING "
+            f"RETURNING id, name, lower(name)"
+        )
+        params = [value for name in names for value in (user.pk, name)]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return {
+            key: self.model.from_db(
+                db, ["id", "name", "user_id"], (pk, name, user.pk)
+            )
+            for pk, name, key in rows
+        }
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
 
+    objects = RecipeAttrManager()
+
     def __str__(self):
         return self.name
 
@@ -85,5 +205,7 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = RecipeAttrManager()
+
     def __str__(self):
         return self.name
@@ -0,0 +1,45 @@
+"""
+API parsers backed by optional fast deserialization libraries.
+"""
+
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core.renderers import ORJSONRenderer, msgpack, orjson
+
+
+class ORJSONParser(parsers.JSONParser):
+    """JSONParser decoding UTF-8 bodies with orjson when installed.
+
+    Bodies orjson rejects are handed to the stdlib parser, so edge cases
+    such as integers beyond 64 bits and error messages stay the same.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != "utf-8":
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parse MessagePack request bodies, requires the msgpack package."""
+
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
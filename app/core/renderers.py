@@ -0,0 +1,87 @@
+"""
+API renderers backed by optional fast serialization libraries.
+"""
+
+from decimal import Decimal
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+if orjson is not None:
+    # Datetimes and dataclasses go through DRF's encoder like any other
+    # non-native type, so their output matches the stdlib renderer.
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer producing the same bytes with orjson when installed.
+
+    Indented output, non-compact or ASCII-only settings and anything
+    orjson cannot encode fall back to the stdlib based JSONRenderer.
+    """
+
+    def _use_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None
+            and self.compact
+            and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if not self._use_orjson(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=ORJSON_OPTIONS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping of U+2028/U+2029 as JSONRenderer.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Render responses as MessagePack, requires the msgpack package.
+
+    Values MessagePack has no type for are converted like in JSON
+    responses, except Decimals which are sent as strings so that no
+    precision is lost to floats.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def _default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj)
+        return encoders.JSONEncoder().default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self._default, use_bin_type=True)
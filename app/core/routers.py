@@ -0,0 +1,109 @@
+"""
+Database router spreading request reads over read replicas.
+
+Reads go to a replica only while a safe (GET, HEAD, OPTIONS) request is
+being handled and the requesting user has not written recently. Writes,
+reads inside a transaction on the primary, unsafe requests, users and
+tokens (which authenticate requests right after signing up or logging
+in) and anything running outside a request (commands, background
+threads) use "default".
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+class _RequestState:
+    def __init__(self, request):
+        self.request = request
+        self.pinned = None
+        self.resolving = False
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+def _pin_cache():
+    return caches[settings.DB_REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_user(user_id):
+    """Send the user's reads to the primary for DB_REPLICA_PIN_SECONDS."""
+    _pin_cache().set(_pin_key(user_id), True, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user_id):
+    return bool(_pin_cache().get(_pin_key(user_id)))
+
+
+def start_request(request):
+    _state.set(_RequestState(request))
+
+
+def end_request():
+    _state.set(None)
+
+
+def _use_primary(state):
+    if state is None or state.request.method not in SAFE_METHODS:
+        return True
+    if state.pinned is not None:
+        return state.pinned
+    if state.resolving:
+        # Resolving a lazy request.user queries the session or token
+        # tables, which must not recurse back into the pin lookup.
+        return True
+    state.resolving = True
+    try:
+        user = getattr(state.request, "user", None)
+        if user is None or not user.is_authenticated:
+            # The user is unknown until DRF authenticates the request,
+            # so do not remember the answer yet.
+            return False
+        state.pinned = is_pinned(user.pk)
+    finally:
+        state.resolving = False
+    return state.pinned
+
+
+def _primary_models():
+    return {"authtoken.token", settings.AUTH_USER_MODEL.lower()}
+
+
+class ReplicaRouter:
+    """Route reads to settings.DATABASE_REPLICAS when it is safe to."""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if model._meta.label_lower in _primary_models():
+            return DEFAULT_DB_ALIAS
+        if _use_primary(_state.get()):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
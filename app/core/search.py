@@ -0,0 +1,36 @@
+"""
+Full-text search vector maintenance for recipes.
+"""
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _names_subquery(model):
+    """Space separated names of model rows attached to the outer recipe."""
+    names = (
+        model.objects.filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(names=StringAgg("name", delimiter=" "))
+        .values("names")
+    )
+    return Coalesce(Subquery(names), Value(""))
+
+
+def build_search_vector(tag_model, ingredient_model):
+    """Weighted vector over title, tag/ingredient names and description."""
+    return (
+        SearchVector("title", weight="A")
+        + SearchVector(_names_subquery(tag_model), weight="B")
+        + SearchVector(_names_subquery(ingredient_model), weight="B")
+        + SearchVector("description", weight="C")
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the stored search vector for every recipe in queryset."""
+    from core.models import Tag, Ingredient
+
+    queryset.update(search_vector=build_search_vector(Tag, Ingredient))
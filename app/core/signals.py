@@ -0,0 +1,65 @@
+"""
+Signal handlers keeping denormalized recipe data up to date.
+"""
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import update_search_vectors
+
+SEARCH_FIELDS = {"title", "description"}
+
+
+def _refresh_search(recipe_ids):
+    if recipe_ids:
+        update_search_vectors(Recipe.objects.filter(id__in=recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    _refresh_search([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_attrs_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _refresh_search([instance.pk])
+    elif action == "pre_clear":
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        _refresh_search(getattr(instance, "_search_recipe_ids", []))
+    elif action in ("post_add", "post_remove"):
+        _refresh_search(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    if not created:
+        _refresh_search(instance.recipe_set.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    instance._search_recipe_ids = list(
+        instance.recipe_set.values_list("id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    _refresh_search(getattr(instance, "_search_recipe_ids", []))
@@ -2,13 +2,22 @@
 Test custom Django management commands.
 """
 
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Recipe, Tag
 
 
 @patch("core.management.commands.wait_for_db.Command.check")
@@ -33,3 +42,215 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=["default"])
+
+
+class ImportRecipesTests(TestCase):
+    """Test the import_recipes command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "import@example.com", "testpass123"
+        )
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as handle:
+            handle.write(content)
+        return path
+
+    def _call(self, path, **options):
+        out = StringIO()
+        call_command(
+            "import_recipes",
+            path,
+            user=self.user.email,
+            stdout=out,
+            stderr=StringIO(),
+            **options,
+        )
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        Tag.objects.create(user=self.user, name="vegan")
+        rows = [
+            {
+                "title": f"recipe{i}",
+                "time_minutes": 10,
+                "price": "5.50",
+                "tags": [{"name": "vegan"}, {"name": f"tag{i}"}],
+                "ingredients": ["salt", "salt"],
+            }
+            for i in range(5)
+        ]
+        rows.insert(2, {"title": "broken", "price": "x"})
+        path = self._write(
+            "recipes.ndjson", "\n".join(json.dumps(row) for row in rows)
+        )
+
+        out = self._call(path, batch_size=2)
+
+        self.assertIn("5 imported, 1 skipped", out)
+        self.assertIn("rows/s", out)
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 5)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 6)
+        recipe = recipes.get(title="recipe0")
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)), {"vegan", "tag0"}
+        )
+        self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(recipe.price, Decimal("5.50"))
+        self.assertTrue(
+            Recipe.objects.filter(search_vector="tag0").exists()
+        )
+
+    def test_import_skips_malformed_lines(self):
+        path = self._write(
+            "recipes.ndjson",
+            '{"title": "first", "time_minutes": 1, "price": "1.00"}\n'
+            '{"title": \n'
+            "[1, 2]\n"
+            '{"title": "last", "time_minutes": 1, "price": "1.00"}\n',
+        )
+        err = StringIO()
+
+        call_command(
+            "import_recipes",
+            path,
+            user=self.user.email,
+            stdout=StringIO(),
+            stderr=err,
+        )
+
+        titles = Recipe.objects.filter(user=self.user).values_list(
+            "title", flat=True
+        )
+        self.assertEqual(sorted(titles), ["first", "last"])
+        self.assertIn("Row 2 skipped: ['Invalid JSON", err.getvalue())
+        self.assertIn(
+            "Row 3 skipped: ['Expected a JSON object.']", err.getvalue()
+        )
+
+    def test_import_skips_invalid_tags(self):
+        rows = [
+            {"title": "string", "tags": "vegan"},
+            {"title": "number", "tags": 5},
+            {"title": "long", "tags": ["x" * 300]},
+            {"title": "nested", "ingredients": [{"name": ["salt"]}]},
+            {"title": "ok", "tags": ["vegan", {"name": "quick"}]},
+        ]
+        path = self._write(
+            "recipes.ndjson",
+            "\n".join(
+                json.dumps({"time_minutes": 1, "price": "1.00", **row})
+                for row in rows
+            ),
+        )
+        checkpoint = os.path.join(self.tmpdir.name, "progress.json")
+        err = StringIO()
+
+        call_command(
+            "import_recipes",
+            path,
+            user=self.user.email,
+            checkpoint=checkpoint,
+            stdout=StringIO(),
+            stderr=err,
+        )
+
+        titles = Recipe.objects.filter(user=self.user).values_list(
+            "title", flat=True
+        )
+        self.assertEqual(list(titles), ["ok"])
+        self.assertEqual(
+            set(Tag.objects.values_list("name", flat=True)),
+            {"vegan", "quick"},
+        )
+        errors = err.getvalue()
+        for line in (1, 2):
+            self.assertIn(
+                f"Row {line} skipped: ['tags: Expected a list of names.']",
+                errors,
+            )
+        self.assertIn("Row 3 skipped: ['tags: Ensure", errors)
+        self.assertIn("Row 4 skipped: ['ingredients: Expected", errors)
+        with open(checkpoint) as handle:
+            self.assertEqual(json.load(handle), {"rows": 5})
+
+    def test_import_reuses_non_ascii_names(self):
+        Tag.objects.create(user=self.user, name="İzmir")
+        row = {
+            "title": "Köfte",
+            "time_minutes": 10,
+            "price": "5.50",
+            "tags": ["İZMIR", "ÉPICE", "épice"],
+        }
+        path = self._write("recipes.ndjson", json.dumps(row))
+
+        self._call(path)
+
+        recipe = Recipe.objects.get(user=self.user, title="Köfte")
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {"İzmir", "ÉPICE"},
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_csv(self):
+        path = self._write(
+            "recipes.csv",
+            "title,time_minutes,price,tags,ingredients\n"
+            "Soup,20,3.00,vegan|quick,water\n",
+        )
+
+        self._call(path)
+
+        recipe = Recipe.objects.get(user=self.user, title="Soup")
+        self.assertEqual(recipe.time_minutes, 20)
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {"vegan", "quick"},
+        )
+
+    def test_import_resumes_from_checkpoint(self):
+        rows = [
+            {"title": f"recipe{i}", "time_minutes": 1, "price": "1.00"}
+            for i in range(4)
+        ]
+        path = self._write(
+            "recipes.ndjson", "\n".join(json.dumps(row) for row in rows)
+        )
+        checkpoint = self._write("progress.json", json.dumps({"rows": 3}))
+
+        self._call(path, checkpoint=checkpoint)
+
+        titles = list(
+            Recipe.objects.filter(user=self.user).values_list(
+                "title", flat=True
+            )
+        )
+        self.assertEqual(titles, ["recipe3"])
+        with open(checkpoint) as handle:
+            self.assertEqual(json.load(handle), {"rows": 4})
+
+    def test_import_unknown_user(self):
+        path = self._write("recipes.ndjson", "")
+
+        with self.assertRaises(CommandError):
+            call_command("import_recipes", path, user="nobody@example.com")
+
+
+class BenchmarkSerializersTests(TestCase):
+
+    def test_benchmark_reports_parity_and_rolls_back(self):
+        out = StringIO()
+
+        call_command(
+            "benchmark_serializers", recipes=20, repeat=1, stdout=out
+        )
+
+        self.assertIn("Identical output", out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
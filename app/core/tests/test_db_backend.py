@@ -0,0 +1,171 @@
+"""
+Test the pooled PostgreSQL backend.
+"""
+
+import threading
+
+import psycopg2
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.backends.postgresql.base import DatabaseWrapper
+from core.backends.postgresql.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = 0
+        self.rolled_back = False
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rolled_back = True
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def _pool(self, **options):
+        return ConnectionPool(FakeConnection, **options)
+
+    def test_connections_reused(self):
+        pool = self._pool(max_size=2)
+        conn = pool.checkout()
+        pool.checkin(conn)
+
+        self.assertIs(pool.checkout(), conn)
+        stats = pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["connections_created"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_checkin_rolls_back_open_transaction(self):
+        pool = self._pool()
+        conn = pool.checkout()
+        conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.checkin(conn)
+
+        self.assertTrue(conn.rolled_back)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_closed_connection_replaced(self):
+        pool = self._pool()
+        conn = pool.checkout()
+        pool.checkin(conn)
+        conn.closed = 1
+
+        new_conn = pool.checkout()
+
+        self.assertIsNot(new_conn, conn)
+        self.assertEqual(pool.stats()["reconnects"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = self._pool(max_size=1, timeout=0.01)
+        pool.checkout()
+
+        with self.assertRaises(PoolTimeout):
+            pool.checkout()
+
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertEqual(stats["timeouts"], 1)
+
+    def test_waiter_gets_returned_connection(self):
+        pool = self._pool(max_size=1, timeout=5)
+        conn = pool.checkout()
+        timer = threading.Timer(0.05, pool.checkin, args=[conn])
+        timer.start()
+
+        self.assertIs(pool.checkout(), conn)
+        timer.join()
+        self.assertEqual(pool.stats()["waits"], 1)
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool(self._fail, max_size=1, timeout=0.01)
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.checkout()
+
+        self.assertEqual(pool.stats()["size"], 0)
+
+    def _fail(self):
+        raise psycopg2.OperationalError("down")
+
+
+class DatabaseWrapperTests(SimpleTestCase):
+    databases = {"default"}
+
+    def _wrapper(self, **settings):
+        settings_dict = {**connection.settings_dict, **settings}
+        wrapper = DatabaseWrapper(settings_dict, alias="default")
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            return cursor.fetchone()[0]
+
+    def test_pooled_connection_reused(self):
+        wrapper = self._wrapper(POOL={"max_size": 2})
+        self._query(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+
+        self.assertFalse(raw.closed)
+        self._query(wrapper)
+        self.assertIs(wrapper.connection, raw)
+        self.assertGreaterEqual(wrapper._pool.stats()["checkouts"], 2)
+        wrapper.close()
+        wrapper._pool.close()
+
+    def test_health_check_replaces_dead_connection(self):
+        wrapper = self._wrapper(CONN_HEALTH_CHECKS=True, CONN_MAX_AGE=60)
+        self._query(wrapper)
+        dead = wrapper.connection
+        dead.close()
+
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(self._query(wrapper), 1)
+        self.assertIsNot(wrapper.connection, dead)
+
+
+class DatabasePoolStatsViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_requires_staff(self):
+        user = get_user_model().objects.create_user(
+            "pool@example.com", "testpass123"
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(reverse("db-pool-stats"))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats_for_staff(self):
+        admin = get_user_model().objects.create_superuser(
+            "admin@example.com", "testpass123"
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(reverse("db-pool-stats"))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, dict)
@@ -0,0 +1,149 @@
+"""
+Tests for the response compression middleware.
+"""
+
+import gzip
+import json
+from unittest.mock import patch
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import CompressionMiddleware, accepted_encodings
+
+BODY = json.dumps([{"id": i, "title": "recipe"} for i in range(200)])
+
+
+@override_settings(
+    COMPRESSION_MIN_SIZE=200,
+    COMPRESSION_CONTENT_TYPES=["application/json", "application/x-ndjson"],
+    MEDIA_URL="/static/media/",
+)
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _get(self, response, path="/api/recipe/recipes/", accept="br, gzip"):
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def _json(self, body=BODY, **kwargs):
+        return HttpResponse(body, content_type="application/json", **kwargs)
+
+    def test_brotli_preferred(self):
+        response = self._get(self._json())
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(
+            response["Content-Length"], str(len(response.content))
+        )
+        self.assertEqual(brotli.decompress(response.content).decode(), BODY)
+
+    def test_gzip(self):
+        response = self._get(self._json(), accept="gzip, br;q=0")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content).decode(), BODY)
+
+    @patch("core.middleware.brotli", None)
+    def test_gzip_without_brotli(self):
+        response = self._get(self._json())
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_not_accepted(self):
+        response = self._get(self._json(), accept="identity")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response.content.decode(), BODY)
+
+    def test_below_threshold(self):
+        response = self._get(self._json('{"id": 1}'))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_content_type_not_allowed(self):
+        response = self._get(HttpResponse(BODY, content_type="image/png"))
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_media_skipped(self):
+        response = self._get(self._json(), path="/static/media/uploads/a")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_already_encoded(self):
+        response = self._get(self._json(headers={"Content-Encoding": "br"}))
+
+        self.assertEqual(response.content.decode(), BODY)
+
+    def test_strong_etag_weakened(self):
+        response = self._get(self._json(headers={"ETag": '"abc"'}))
+
+        self.assertEqual(response["ETag"], 'W/"abc"')
+
+    def _stream(self, accept, count=3):
+        rows = [
+            json.dumps({"id": i, "title": f"recipe {i}"}) + "\n"
+            for i in range(count)
+        ]
+        return self._get(
+            StreamingHttpResponse(
+                iter(rows), content_type="application/x-ndjson"
+            ),
+            accept=accept,
+        ), "".join(rows)
+
+    @override_settings(COMPRESSION_STREAM_FLUSH_SIZE=64)
+    def test_streaming_brotli(self):
+        response, body = self._stream("br")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertFalse(response.has_header("Content-Length"))
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(brotli.decompress(b"".join(chunks)).decode(), body)
+
+    def test_streaming_brotli_flushes_in_batches(self):
+        response, body = self._stream("br", count=5000)
+        content = b"".join(response.streaming_content)
+        gzipped = b"".join(self._stream("gzip", count=5000)[0])
+
+        self.assertEqual(brotli.decompress(content).decode(), body)
+        self.assertLess(len(content), len(gzipped))
+
+    def test_streaming_gzip(self):
+        response, body = self._stream("gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        content = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(content).decode(), body)
+
+
+class AcceptedEncodingsTests(SimpleTestCase):
+
+    def test_parse(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=1.0, BR; q=0.5, deflate;q=0, x;q=?"),
+            {"gzip", "br"},
+        )
+
+    def test_empty(self):
+        self.assertEqual(accepted_encodings(""), set())
+
+
+class CompressionDefaultsTests(SimpleTestCase):
+
+    def test_html_not_compressed(self):
+        # Browsable API pages hold CSRF tokens next to echoed input,
+        # compressing them would expose the tokens to BREACH.
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        response = HttpResponse("<p>page</p>" * 200)
+
+        response = CompressionMiddleware(lambda request: response)(request)
+
+        self.assertFalse(response.has_header("Content-Encoding"))
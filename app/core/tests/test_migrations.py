@@ -0,0 +1,87 @@
+"""
+Test data migrations.
+"""
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTestCase(TransactionTestCase):
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+class PopulateSearchVectorMigrationTests(MigrationTestCase):
+    before = [("core", "0009_recipe_filter_indexes")]
+    after = [("core", "0010_recipe_search_vector")]
+
+    def test_search_vector_populated(self):
+        apps = self._migrate(self.before)
+        User = apps.get_model("core", "User")
+        Recipe = apps.get_model("core", "Recipe")
+        Tag = apps.get_model("core", "Tag")
+        user = User.objects.create(email="search@example.com")
+        recipe = Recipe.objects.create(
+            user=user,
+            title="Soup",
+            description="Hot",
+            time_minutes=1,
+            price=1,
+        )
+        recipe.tags.add(Tag.objects.create(user=user, name="vegan"))
+
+        apps = self._migrate(self.after)
+        Recipe = apps.get_model("core", "Recipe")
+
+        vector = Recipe.objects.get(id=recipe.id).search_vector
+        self.assertEqual(vector, "'hot':3C 'soup':1A 'vegan':2B")
+
+
+class MergeDuplicateNamesMigrationTests(MigrationTestCase):
+    before = [("core", "0013_attr_name_prefix_indexes")]
+    after = [("core", "0014_unique_attr_names")]
+
+    def test_duplicates_merged(self):
+        apps = self._migrate(self.before)
+        User = apps.get_model("core", "User")
+        Recipe = apps.get_model("core", "Recipe")
+        Tag = apps.get_model("core", "Tag")
+        user = User.objects.create(email="merge@example.com")
+        other = User.objects.create(email="other@example.com")
+        keep = Tag.objects.create(user=user, name="Vegan")
+        duplicate = Tag.objects.create(user=user, name="vegan")
+        other_tag = Tag.objects.create(user=other, name="VEGAN")
+        both = Recipe.objects.create(
+            user=user, title="both", time_minutes=1, price=1
+        )
+        both.tags.add(keep, duplicate)
+        moved = Recipe.objects.create(
+            user=user, title="moved", time_minutes=1, price=1
+        )
+        moved.tags.add(duplicate)
+
+        apps = self._migrate(self.after)
+        Tag = apps.get_model("core", "Tag")
+        Recipe = apps.get_model("core", "Recipe")
+
+        self.assertEqual(
+            set(Tag.objects.values_list("id", flat=True)),
+            {keep.id, other_tag.id},
+        )
+        self.assertEqual(
+            list(Recipe.objects.get(id=both.id).tags.values_list("id")),
+            [(keep.id,)],
+        )
+        self.assertEqual(
+            list(Recipe.objects.get(id=moved.id).tags.values_list("id")),
+            [(keep.id,)],
+        )
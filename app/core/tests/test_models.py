@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 
 from decimal import Decimal
 from core import models
@@ -77,6 +78,55 @@ class ModelTests(TestCase):
         )
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_tag_names_unique_ignoring_case(self):
+        user = get_user_model().objects.create_user(
+            "test@example.com", "test123"
+        )
+        other = get_user_model().objects.create_user(
+            "other@example.com", "test123"
+        )
+        models.Tag.objects.create(user=user, name="Vegan")
+        models.Tag.objects.create(user=other, name="vegan")
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name="VEGAN")
+
+    def test_get_or_create_names(self):
+        user = get_user_model().objects.create_user(
+            "test@example.com", "test123"
+        )
+        vegan = models.Ingredient.objects.create(user=user, name="Vegan")
+
+        with self.assertNumQueries(3):
+            found = models.Ingredient.objects.get_or_create_names(
+                user, ["vegan", "Salt", "salt"]
+            )
+
+        self.assertEqual(set(found), {"vegan", "Salt", "salt"})
+        self.assertEqual(found["vegan"].id, vegan.id)
+        self.assertEqual(found["Salt"].name, "Salt")
+        self.assertEqual(found["salt"].id, found["Salt"].id)
+        self.assertEqual(
+            models.Ingredient.objects.filter(user=user).count(), 2
+        )
+
+    def test_get_or_create_names_non_ascii(self):
+        # Python and PostgreSQL lower-case these differently depending
+        # on the database locale ("İ" gains a combining dot in Python).
+        user = get_user_model().objects.create_user(
+            "test@example.com", "test123"
+        )
+        names = ["İzmir", "ÉPICE"]
+        created = models.Tag.objects.get_or_create_names(user, names)
+
+        found = models.Tag.objects.get_or_create_names(user, names)
+
+        self.assertEqual(
+            {name: tag.id for name, tag in found.items()},
+            {name: tag.id for name, tag in created.items()},
+        )
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
     @patch("core.models.uuid.uuid4")
     def test_creating_url_for_image(self, mock_uuid):
         uuid = "test_uuid"
@@ -84,3 +134,11 @@ class ModelTests(TestCase):
         file_path = models.get_image_file_path(None, "example.jpg")
 
         self.assertEqual(file_path, f"uploads/recipes/{uuid}.jpg")
+
+    def test_creating_content_addressed_url_for_image(self):
+        recipe = models.Recipe()
+        recipe._image_content_hash = "abcdef"
+        file_path = models.get_image_file_path(recipe, "example.JPG")
+
+        self.assertEqual(file_path, "uploads/recipes/cas/ab/abcdef.jpg")
+        self.assertTrue(models.is_content_addressed(file_path))
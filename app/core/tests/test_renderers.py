@@ -0,0 +1,148 @@
+"""
+Test the orjson and MessagePack renderers and parsers.
+"""
+
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from unittest.mock import patch
+
+import msgpack
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+SAMPLE = OrderedDict(
+    [
+        ("id", 7),
+        ("price", Decimal("5.50")),
+        ("raw_price", Decimal("12.345")),
+        ("title", "Crème brûlée 🍮 \u2028\u2029 \"quoted\""),
+        (
+            "created",
+            datetime.datetime(
+                2024, 4, 21, 11, 50, 3, 123456, tzinfo=datetime.timezone.utc
+            ),
+        ),
+        ("naive", datetime.datetime(2024, 4, 21, 11, 50)),
+        ("day", datetime.date(2024, 4, 21)),
+        ("at", datetime.time(11, 50, 3, 500)),
+        ("took", datetime.timedelta(minutes=3)),
+        ("uuid", uuid.UUID("12345678-1234-5678-1234-567812345678")),
+        ("lazy", gettext_lazy("This field is required.")),
+        ("counts", {1: "one", 2: "two"}),
+        ("nested", [{"id": 1, "name": "tag"}, (1, 2), None, True, 1.5]),
+    ]
+)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_matches_json_renderer(self):
+        expected = JSONRenderer().render(SAMPLE)
+
+        with patch.object(JSONRenderer, "render") as stdlib_render:
+            rendered = ORJSONRenderer().render(SAMPLE)
+
+        stdlib_render.assert_not_called()
+        self.assertEqual(rendered, expected)
+
+    def test_huge_integers_fall_back(self):
+        data = {"id": 2**70}
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indent_matches_json_renderer(self):
+        media_type = "application/json; indent=4"
+
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type),
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_unsupported_type_raises_like_json_renderer(self):
+        with self.assertRaises(TypeError):
+            JSONRenderer().render({"value": object()})
+        with self.assertRaises(TypeError):
+            ORJSONRenderer().render({"value": object()})
+
+    @patch("core.renderers.orjson", None)
+    def test_fallback_without_orjson(self):
+        self.assertEqual(
+            ORJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE)
+        )
+
+
+class ORJSONParserTests(SimpleTestCase):
+
+    def _parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), "application/json")
+
+    def test_matches_json_parser(self):
+        body = JSONRenderer().render(SAMPLE)
+
+        self.assertEqual(
+            self._parse(ORJSONParser(), body),
+            self._parse(JSONParser(), body),
+        )
+
+    def test_invalid_json(self):
+        with self.assertRaises(ParseError):
+            self._parse(ORJSONParser(), b'{"title": ')
+
+    def test_nan_rejected(self):
+        with self.assertRaises(ParseError):
+            self._parse(ORJSONParser(), b'{"price": NaN}')
+
+    def test_huge_integers_parsed(self):
+        data = self._parse(ORJSONParser(), b'{"id": 1180591620717411303424}')
+
+        self.assertEqual(data, {"id": 2**70})
+
+    @patch("core.parsers.orjson", None)
+    def test_fallback_without_orjson(self):
+        self.assertEqual(self._parse(ORJSONParser(), b'{"id": 1}'), {"id": 1})
+
+
+class MessagePackTests(SimpleTestCase):
+
+    def _parse(self, body):
+        return MessagePackParser().parse(io.BytesIO(body))
+
+    def test_round_trip_matches_json(self):
+        body = MessagePackRenderer().render(SAMPLE)
+        expected = ORJSONParser().parse(
+            io.BytesIO(JSONRenderer().render(SAMPLE))
+        )
+        # Decimals keep their exact digits instead of becoming floats.
+        expected["price"] = "5.50"
+        expected["raw_price"] = "12.345"
+        # MessagePack maps keep non-str keys as they are.
+        expected["counts"] = {1: "one", 2: "two"}
+
+        self.assertEqual(msgpack.unpackb(body, strict_map_key=False), expected)
+
+    def test_none_renders_empty(self):
+        self.assertEqual(MessagePackRenderer().render(None), b"")
+
+    def test_parse(self):
+        body = msgpack.packb({"title": "Süß", "tags": [1, 2]})
+
+        self.assertEqual(self._parse(body), {"title": "Süß", "tags": [1, 2]})
+
+    def test_invalid_body(self):
+        for body in (b"\xc1", b"\x92\x01", b"\x01\x02", b"\x81\x01\x01"):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                self._parse(body)
@@ -0,0 +1,177 @@
+"""
+Test the read replica router and read-your-writes middleware.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from core import routers
+from core.checks import check_replica_pin_cache
+from core.middleware import ReadYourWritesMiddleware
+from core.models import Recipe, User
+
+
+class FakeUser:
+    is_authenticated = True
+
+    def __init__(self, pk):
+        self.pk = pk
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+        caches["replica_pins"].clear()
+        self.addCleanup(routers.end_request)
+
+    def _start(self, method="get", user=None):
+        request = getattr(self.factory, method)("/api/recipe/recipes/")
+        request.user = user or AnonymousUser()
+        routers.start_request(request)
+        return request
+
+    def test_no_replicas_configured(self):
+        self._start()
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_reads_outside_request_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_safe_request_reads_from_replica(self):
+        self._start(user=FakeUser(1))
+
+        self.assertEqual(self.router.db_for_read(Recipe), "replica")
+
+    def test_unsafe_request_reads_from_primary(self):
+        self._start("post", user=FakeUser(1))
+
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_pinned_user_reads_from_primary(self):
+        routers.pin_user(1)
+        self._start(user=FakeUser(1))
+
+        self.assertEqual(self.router.db_for_read(Recipe), "default")
+
+    def test_pin_is_per_user(self):
+        routers.pin_user(1)
+        self._start(user=FakeUser(2))
+
+        self.assertEqual(self.router.db_for_read(Recipe), "replica")
+
+    def test_users_and_tokens_read_from_primary(self):
+        self._start(user=FakeUser(1))
+
+        self.assertEqual(self.router.db_for_read(User), "default")
+        self.assertEqual(self.router.db_for_read(Token), "default")
+
+    def test_user_resolution_does_not_recurse(self):
+        router = self.router
+
+        class LazyUser:
+            pk = 1
+
+            @property
+            def is_authenticated(self):
+                self.inner = router.db_for_read(Recipe)
+                return True
+
+        user = LazyUser()
+        self._start(user=user)
+
+        self.assertEqual(self.router.db_for_read(Recipe), "replica")
+        self.assertEqual(user.inner, "default")
+
+    def test_writes_and_migrations_use_primary(self):
+        self._start(user=FakeUser(1))
+
+        self.assertEqual(self.router.db_for_write(Recipe), "default")
+        self.assertFalse(self.router.allow_migrate("replica", "core"))
+        self.assertIsNone(self.router.allow_migrate("default", "core"))
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], DB_REPLICA_PIN_SECONDS=5)
+class ReadYourWritesMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        caches["replica_pins"].clear()
+        self.addCleanup(routers.end_request)
+
+    def _call(self, method, user, status_code=200):
+        request = getattr(self.factory, method)("/api/recipe/recipes/")
+        request.user = user
+        middleware = ReadYourWritesMiddleware(
+            lambda request: HttpResponse(status=status_code)
+        )
+        return middleware(request)
+
+    def test_successful_write_pins_user(self):
+        self._call("post", FakeUser(1))
+
+        self.assertTrue(routers.is_pinned(1))
+
+    def test_failed_write_does_not_pin(self):
+        self._call("patch", FakeUser(1), status_code=400)
+
+        self.assertFalse(routers.is_pinned(1))
+
+    def test_read_and_anonymous_write_do_not_pin(self):
+        self._call("get", FakeUser(1))
+        self._call("post", AnonymousUser())
+
+        self.assertFalse(routers.is_pinned(1))
+
+    def test_state_cleared_after_response(self):
+        self._call("get", FakeUser(1))
+
+        self.assertEqual(
+            routers.ReplicaRouter().db_for_read(Recipe), "default"
+        )
+
+    def test_streaming_response_keeps_state_until_closed(self):
+        router = routers.ReplicaRouter()
+        request = self.factory.get("/api/recipe/recipes/export/")
+        request.user = FakeUser(1)
+        response = ReadYourWritesMiddleware(
+            lambda request: StreamingHttpResponse(iter([b"row\n"]))
+        )(request)
+
+        self.assertEqual(router.db_for_read(Recipe), "replica")
+        response.close()
+        self.assertEqual(router.db_for_read(Recipe), "default")
+
+
+class ReplicaPinCacheCheckTests(SimpleTestCase):
+
+    def _caches(self, backend):
+        return {**settings.CACHES, "replica_pins": {"BACKEND": backend}}
+
+    def test_process_local_cache_with_replicas_warns(self):
+        with override_settings(
+            DATABASE_REPLICAS=["replica"],
+            CACHES=self._caches(
+                "django.core.cache.backends.locmem.LocMemCache"
+            ),
+        ):
+            errors = check_replica_pin_cache(None)
+
+        self.assertEqual([error.id for error in errors], ["core.W001"])
+
+    def test_shared_cache_or_no_replicas_pass(self):
+        shared = "django.core.cache.backends.memcached.PyMemcacheCache"
+        with override_settings(
+            DATABASE_REPLICAS=["replica"], CACHES=self._caches(shared)
+        ):
+            self.assertEqual(check_replica_pin_cache(None), [])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_replica_pin_cache(None), [])
@@ -0,0 +1,23 @@
+"""
+Operational endpoints.
+"""
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.backends.postgresql.pool import pool_stats
+from user.authentication import CachedTokenAuthentication
+
+
+class DatabasePoolStatsView(APIView):
+    """Connection pool metrics for this worker process."""
+
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return Response(pool_stats())
@@ -0,0 +1,215 @@
+"""
+Batched writes for recipes and their tags/ingredients.
+
+Bulk operations bypass model signals, so callers here refresh search
+vectors and invalidate cached lists explicitly.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers, status
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import update_search_vectors
+from recipe.cache import invalidate_user_on_commit
+
+ATTR_FIELDS = {"tags": Tag, "ingredients": Ingredient}
+
+
+def get_or_create_attrs(model, user, names):
+    """Return {name: row} for the names, creating missing rows in bulk.
+
+    Names match existing rows regardless of case, so "vegan" resolves to
+    an existing "Vegan" row.
+    """
+    return model.objects.get_or_create_names(user, names)
+
+
+def _resolve_links(user, field, attrs_by_recipe):
+    """Map {recipe_id: [items]} to {recipe_id: {attr_id, ...}}."""
+    names = [
+        item["name"] for items in attrs_by_recipe.values() for item in items
+    ]
+    found = get_or_create_attrs(ATTR_FIELDS[field], user, names)
+    return {
+        recipe_id: {found[item["name"]].id for item in items}
+        for recipe_id, items in attrs_by_recipe.items()
+    }
+
+
+def _sync_links(field, wanted, replace):
+    """Bring the recipes' links to the wanted sets in at most 3 queries."""
+    if not wanted:
+        return
+    m2m = Recipe._meta.get_field(field)
+    through = m2m.remote_field.through
+    source = m2m.m2m_column_name()
+    target = m2m.m2m_reverse_name()
+    existing = {}
+    if replace:
+        rows = through.objects.filter(
+            **{f"{source}__in": list(wanted)}
+        ).values_list("id", source, target)
+        stale = []
+        for row_id, recipe_id, attr_id in rows:
+            if attr_id in wanted[recipe_id]:
+                existing.setdefault(recipe_id, set()).add(attr_id)
+            else:
+                stale.append(row_id)
+        if stale:
+            through.objects.filter(id__in=stale).delete()
+    through.objects.bulk_create(
+        [
+            through(**{source: recipe_id, target: attr_id})
+            for recipe_id, attr_ids in wanted.items()
+            for attr_id in attr_ids - existing.get(recipe_id, set())
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _apply_links(user, attrs, replace):
+    for field in ATTR_FIELDS:
+        attrs_by_recipe = {
+            recipe_id: items[field]
+            for recipe_id, items in attrs.items()
+            if field in items
+        }
+        wanted = _resolve_links(user, field, attrs_by_recipe)
+        _sync_links(field, wanted, replace)
+
+
+def _split_attrs(validated_data):
+    return {
+        field: validated_data.pop(field)
+        for field in ATTR_FIELDS
+        if field in validated_data
+    }
+
+
+def _finish(user, recipe_ids):
+    if recipe_ids:
+        update_search_vectors(Recipe.objects.filter(id__in=recipe_ids))
+        invalidate_user_on_commit(user.pk)
+
+
+def _check_items(items):
+    if not isinstance(items, list):
+        raise serializers.ValidationError("Expected a list of items.")
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise serializers.ValidationError(
+            f"At most {settings.BULK_MAX_ITEMS} items may be sent at once."
+        )
+
+
+def _to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def bulk_create_recipes(serializer_class, items, context):
+    """Validate and create recipes, returning one result per item."""
+    _check_items(items)
+    user = context["request"].user
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item, context=context)
+        if serializer.is_valid():
+            pending.append((index, dict(serializer.validated_data)))
+        else:
+            results[index] = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "errors": serializer.errors,
+            }
+
+    with transaction.atomic():
+        attrs = [_split_attrs(data) for _, data in pending]
+        recipes = Recipe.objects.bulk_create(
+            [Recipe(user=user, **data) for _, data in pending]
+        )
+        _apply_links(
+            user,
+            {recipe.id: attr for recipe, attr in zip(recipes, attrs)},
+            replace=False,
+        )
+        _finish(user, [recipe.id for recipe in recipes])
+
+    for (index, _), recipe in zip(pending, recipes):
+        results[index] = {"status": status.HTTP_201_CREATED, "id": recipe.id}
+    return results
+
+
+def bulk_update_recipes(serializer_class, items, context):
+    """Validate and partially update recipes, one result per item."""
+    _check_items(items)
+    user = context["request"].user
+    ids = [
+        _to_id(item.get("id")) if isinstance(item, dict) else None
+        for item in items
+    ]
+    recipes = Recipe.objects.filter(user=user, id__in=ids).in_bulk()
+    results = [None] * len(items)
+    pending = []
+    for index, (item, recipe_id) in enumerate(zip(items, ids)):
+        recipe = recipes.get(recipe_id)
+        if recipe is None:
+            results[index] = {
+                "status": status.HTTP_404_NOT_FOUND,
+                "errors": {"id": ["Recipe not found."]},
+            }
+            continue
+        serializer = serializer_class(
+            recipe, data=item, partial=True, context=context
+        )
+        if serializer.is_valid():
+            pending.append((index, recipe, dict(serializer.validated_data)))
+        else:
+            results[index] = {
+                "status": status.HTTP_400_BAD_REQUEST,
+                "errors": serializer.errors,
+            }
+
+    # Each recipe only writes the fields its item sent, so columns it
+    # did not touch keep concurrent changes instead of stale values.
+    by_fields = {}
+    attrs = {}
+    for _, recipe, data in pending:
+        attrs[recipe.id] = _split_attrs(data)
+        for attr, value in data.items():
+            setattr(recipe, attr, value)
+        if data:
+            by_fields.setdefault(tuple(sorted(data)), []).append(recipe)
+
+    with transaction.atomic():
+        for fields, group in by_fields.items():
+            Recipe.objects.bulk_update(group, fields)
+        _apply_links(user, attrs, replace=True)
+        _finish(user, list(attrs))
+
+    for index, recipe, _ in pending:
+        results[index] = {"status": status.HTTP_200_OK, "id": recipe.id}
+    return results
+
+
+def bulk_delete_recipes(ids, user):
+    """Delete the user's recipes with the given ids, one result per id."""
+    _check_items(ids)
+    ids = [_to_id(recipe_id) for recipe_id in ids]
+    with transaction.atomic():
+        queryset = Recipe.objects.filter(
+            user=user, id__in=[recipe_id for recipe_id in ids if recipe_id]
+        )
+        found = set(queryset.values_list("id", flat=True))
+        queryset.delete()
+    return [
+        {"status": status.HTTP_204_NO_CONTENT, "id": recipe_id}
+        if recipe_id in found
+        else {
+            "status": status.HTTP_404_NOT_FOUND,
+            "errors": {"id": ["Recipe not found."]},
+        }
+        for recipe_id in ids
+    ]
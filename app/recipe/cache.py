@@ -0,0 +1,108 @@
+"""
+Per-user caching of list responses for the recipe API.
+
+Every user owns a generation token stored in the cache. Cache keys and
+ETags embed the token, so bumping it on any write invalidates all of the
+user's cached lists at once without tracking individual keys.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _generation_key(user_id):
+    return f"api:gen:{user_id}"
+
+
+def get_generation(user_id):
+    """Return the user's current generation token, creating one if needed."""
+    cache = get_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def invalidate_user(user_id):
+    """Drop every cached response belonging to the user."""
+    get_cache().set(_generation_key(user_id), uuid.uuid4().hex, None)
+
+
+def invalidate_user_on_commit(user_id):
+    """Invalidate now and again once the current transaction commits.
+
+    A concurrent request reading before the commit caches the old rows
+    under the new generation, the second bump drops that entry.
+    """
+    invalidate_user(user_id)
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+def _fingerprint(request, view):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    parts = [
+        str(request.user.pk),
+        get_generation(request.user.pk),
+        request.build_absolute_uri(request.path),
+        view.action,
+        request.accepted_media_type or "",
+        repr(params),
+    ]
+    return hashlib.md5("\0".join(parts).encode()).hexdigest()
+
+
+def _strip_weak(etag):
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+class CachedListMixin:
+    """Serve list responses from the per-user cache with ETag support."""
+
+    def cached_response(self, request, build):
+        """Return the cached response for this request or cache build()."""
+        fingerprint = _fingerprint(request, self)
+        etag = quote_etag(fingerprint)
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            # Weak comparison, compression middleware weakens our ETags.
+            etags = {_strip_weak(tag) for tag in parse_etags(if_none_match)}
+            if "*" in etags or etag in etags:
+                return Response(
+                    status=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag},
+                )
+
+        cache = get_cache()
+        key = f"api:list:{fingerprint}"
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={"ETag": etag})
+
+        response = build()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+            response["ETag"] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        parent = super().list
+        return self.cached_response(
+            request, lambda: parent(request, *args, **kwargs)
+        )
@@ -0,0 +1,61 @@
+"""
+Memory-bounded iteration over a user's recipes for exports.
+"""
+
+from itertools import islice
+
+from core.models import Recipe
+
+EXPORT_FIELDS = [
+    "id",
+    "title",
+    "description",
+    "time_minutes",
+    "price",
+    "link",
+]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _attrs_by_recipe(field, recipe_ids):
+    """Return {recipe_id: [{"id", "name"}, ...]} for one M2M field."""
+    m2m = Recipe._meta.get_field(field)
+    source = m2m.m2m_column_name()
+    target = m2m.m2m_reverse_field_name()
+    rows = (
+        m2m.remote_field.through.objects.filter(
+            **{f"{source}__in": recipe_ids}
+        )
+        .order_by(f"{target}_id")
+        .values_list(source, f"{target}_id", f"{target}__name")
+    )
+    attrs = {}
+    for recipe_id, attr_id, name in rows:
+        attrs.setdefault(recipe_id, []).append({"id": attr_id, "name": name})
+    return attrs
+
+
+def iter_recipes(queryset, chunk_size):
+    """Yield recipe dicts with nested tags and ingredients.
+
+    Recipes are read through a server-side cursor and their tags and
+    ingredients are fetched once per chunk, so memory use depends on
+    chunk_size rather than on the size of the collection.
+    """
+    rows = queryset.values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for chunk in _chunks(rows, chunk_size):
+        ids = [row["id"] for row in chunk]
+        tags = _attrs_by_recipe("tags", ids)
+        ingredients = _attrs_by_recipe("ingredients", ids)
+        for row in chunk:
+            row["tags"] = tags.get(row["id"], [])
+            row["ingredients"] = ingredients.get(row["id"], [])
+            yield row
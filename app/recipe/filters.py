@@ -0,0 +1,22 @@
+"""
+Filter backends for the recipe API.
+"""
+
+from rest_framework.filters import OrderingFilter
+
+
+class StableOrderingFilter(OrderingFilter):
+    """OrderingFilter that always ends with id to break ties.
+
+    Cursor pagination needs a total order, otherwise rows sharing the
+    same value (e.g. the same recipe_count) may repeat or be skipped
+    across pages.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        fields = [field.lstrip("-") for field in ordering]
+        if "id" not in fields and "pk" not in fields:
+            direction = "-" if ordering and ordering[0][0] == "-" else ""
+            ordering.append(f"{direction}id")
+        return ordering
@@ -0,0 +1,170 @@
+"""
+Resized image variants for recipe uploads.
+
+Variants are generated off the request thread by a small worker pool.
+Setting IMAGE_VARIANT_BACKEND to "sync" runs the work inline instead,
+which is the fallback used when no worker pool is wanted.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connections, router, transaction
+from PIL import Image, ImageOps, features
+
+from core.models import Recipe, is_content_addressed
+from recipe.cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                thread_name_prefix="image-variants",
+            )
+    return _executor
+
+
+def variant_format():
+    """Return the Pillow format and extension used for variants."""
+    if features.check("webp"):
+        return "WEBP", "webp"
+    return "JPEG", "jpg"
+
+
+def variant_path(image_name, variant):
+    base = os.path.splitext(os.path.basename(image_name))[0]
+    ext = variant_format()[1]
+    return os.path.join(
+        os.path.dirname(image_name), "variants", f"{base}_{variant}.{ext}"
+    )
+
+
+def _render_variant(source, size):
+    fmt = variant_format()[0]
+    img = source.copy()
+    img.thumbnail(size)
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, quality=settings.IMAGE_VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_variants(recipe_id):
+    """Render every configured variant for the recipe's current image."""
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    image_name = recipe.image.name
+    storage = recipe.image.storage
+    shared = is_content_addressed(image_name)
+
+    variants = {
+        name: variant_path(image_name, name)
+        for name in settings.IMAGE_VARIANTS
+    }
+    missing = {
+        name: path
+        for name, path in variants.items()
+        if not (shared and storage.exists(path))
+    }
+    if missing:
+        with recipe.image.open("rb") as image_file:
+            with Image.open(image_file) as original:
+                # Phone photos are stored sideways with an EXIF
+                # orientation, which the variants do not keep.
+                source = ImageOps.exif_transpose(original)
+                for name, path in missing.items():
+                    size = settings.IMAGE_VARIANTS[name]
+                    storage.delete(path)
+                    variants[name] = storage.save(
+                        path, _render_variant(source, size)
+                    )
+
+    updated = Recipe.objects.filter(id=recipe_id, image=image_name).update(
+        image_variants=variants
+    )
+    if updated:
+        invalidate_user(recipe.user_id)
+    elif not shared:
+        for path in variants.values():
+            storage.delete(path)
+
+
+def lock_image(image_name):
+    """Lock a content-addressed file until the transaction ends.
+
+    Reusing a stored file and releasing it both check the recipes
+    pointing at it before acting, so they hold this lock to keep a
+    release from deleting a file a concurrent upload is about to reuse.
+    Must be called inside transaction.atomic().
+    """
+    if not is_content_addressed(image_name):
+        return
+    digest = hashlib.sha256(image_name.encode()).digest()
+    key = int.from_bytes(digest[:8], "big", signed=True)
+    connection = connections[router.db_for_write(Recipe)]
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+
+def release_image(image_name, variants):
+    """Delete an image and its variants once no recipe references it.
+
+    Content-addressed files may be shared between recipes, so the
+    recipes pointing at a file act as its reference count.
+    """
+    if not image_name:
+        return
+    with transaction.atomic(using=router.db_for_write(Recipe)):
+        lock_image(image_name)
+        if Recipe.objects.filter(image=image_name).exists():
+            return
+        storage = Recipe._meta.get_field("image").storage
+        storage.delete(image_name)
+        for path in variants.values():
+            storage.delete(path)
+
+
+def _run_in_worker(recipe_id):
+    try:
+        generate_variants(recipe_id)
+    except Exception:
+        # Nobody waits on the future, log instead of losing the error.
+        logger.exception(
+            "Generating image variants for recipe %s failed.", recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(recipe_id):
+    """Queue variant generation for the recipe on the configured backend."""
+    if settings.IMAGE_VARIANT_BACKEND == "sync":
+        generate_variants(recipe_id)
+    else:
+        _get_executor().submit(_run_in_worker, recipe_id)
+
+
+def variant_urls(recipe, request=None):
+    """Return {variant: url} for the recipe's generated variants."""
+    storage = Recipe._meta.get_field("image").storage
+    urls = {}
+    for name, path in recipe.image_variants.items():
+        url = storage.url(path)
+        urls[name] = request.build_absolute_uri(url) if request else url
+    return urls
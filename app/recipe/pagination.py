@@ -0,0 +1,32 @@
+"""
+Cursor pagination for the recipe API.
+"""
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination over recipes, newest first."""
+
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = ("-id",)
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """Page number pagination for search results ordered by relevance.
+
+    Search ranks are floats, which do not round-trip through a cursor,
+    so ranked results cannot use keyset pagination.
+    """
+
+    page_size = RecipeCursorPagination.page_size
+    page_size_query_param = "page_size"
+    max_page_size = RecipeCursorPagination.max_page_size
+
+
+class RecipeAttrCursorPagination(RecipeCursorPagination):
+    """Keyset pagination over tags/ingredients, ordered by name."""
+
+    ordering = ("-name", "-id")
@@ -0,0 +1,69 @@
+"""
+Streaming renderers for recipe exports.
+"""
+
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRenderer(BaseRenderer):
+    """Renderer whose payload is produced row by row with stream().
+
+    render() is only used for non-streamed bodies such as error
+    responses, which are written as JSON.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data, cls=DjangoJSONEncoder).encode(self.charset)
+
+    def stream(self, rows):
+        raise NotImplementedError
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, rows):
+        for row in rows:
+            yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+class _Echo:
+    """File-like object handing each written CSV line straight back."""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    columns = [
+        "id",
+        "title",
+        "description",
+        "time_minutes",
+        "price",
+        "link",
+        "tags",
+        "ingredients",
+    ]
+    separator = "|"
+
+    def stream(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(self.columns)
+        for row in rows:
+            for field in ("tags", "ingredients"):
+                row[field] = self.separator.join(
+                    item["name"] for item in row[field]
+                )
+            yield writer.writerow([row[column] for column in self.columns])
@@ -0,0 +1,89 @@
+"""
+Precompiled to_representation for read-heavy serializers.
+
+DRF resolves every field of every row through Field.get_attribute and
+to_representation. For list responses of thousands of recipes this
+dominates CPU, although the field set is the same for every row. Here
+the bound fields are turned once into (name, getter, converter) steps
+and rows are rendered with plain attribute access, producing exactly
+the same data as Serializer.to_representation.
+"""
+
+from operator import attrgetter
+
+from rest_framework import serializers
+
+# Fields whose to_representation returns model values unchanged.
+IDENTITY_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+
+def _nested_getter(source, render):
+    def get(instance):
+        return [render(item) for item in getattr(instance, source).all()]
+
+    return get
+
+
+def compile_representation(serializer):
+    """Return a function rendering instances like the serializer does.
+
+    Returns None when a field cannot be compiled, callers then keep
+    using the regular to_representation.
+    """
+    model_fields = {
+        field.name for field in serializer.Meta.model._meta.get_fields()
+    }
+    steps = []
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(field.parent, field.method_name)
+            steps.append((field.field_name, method, None))
+            continue
+        if len(field.source_attrs) != 1:
+            return None
+        source = field.source_attrs[0]
+        if source not in model_fields:
+            # Properties and methods may need DRF's callable handling.
+            return None
+        if isinstance(field, serializers.ListSerializer):
+            if not isinstance(field.child, serializers.ModelSerializer):
+                return None
+            render = compile_representation(field.child)
+            if render is None:
+                return None
+            steps.append(
+                (field.field_name, _nested_getter(source, render), None)
+            )
+        elif isinstance(field, serializers.BaseSerializer):
+            return None
+        elif type(field) in IDENTITY_FIELDS:
+            steps.append((field.field_name, attrgetter(source), None))
+        else:
+            convert = field.to_representation
+            steps.append((field.field_name, attrgetter(source), convert))
+
+    def render(instance):
+        data = {}
+        for name, get, convert in steps:
+            value = get(instance)
+            if convert is not None and value is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+    return render
+
+
+class CompiledRepresentationMixin:
+    """Render instances with a representation compiled once per serializer.
+
+    With many=True the child serializer is shared by all rows, so the
+    fields are inspected once per response instead of once per row.
+    """
+
+    def to_representation(self, instance):
+        render = getattr(self, "_compiled_representation", None)
+        if render is None:
+            render = compile_representation(self) or super().to_representation
+            self._compiled_representation = render
+        return render(instance)
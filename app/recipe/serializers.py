@@ -1,8 +1,48 @@
-from rest_framework.serializers import ModelSerializer
-from core.models import Recipe, Tag, Ingredient
+import os
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
+from rest_framework.serializers import (
+    CharField,
+    DecimalField,
+    FloatField,
+    IntegerField,
+    ListField,
+    ModelSerializer,
+    Serializer,
+    SerializerMethodField,
+    ValidationError,
+)
+from core.models import Recipe, Tag, Ingredient, content_image_path
+from recipe.bulk import get_or_create_attrs
+from recipe.images import lock_image, variant_urls
+from recipe.representation import CompiledRepresentationMixin
 
-class TagSerializer(ModelSerializer):
+
+class UniqueNameMixin:
+    """Reject names another row of the user has, ignoring case."""
+
+    def validate_name(self, name):
+        user = (
+            self.instance.user
+            if self.instance is not None
+            else self.context["request"].user
+        )
+        taken = (
+            self.Meta.model.objects.annotate(lower_name=Lower("name"))
+            .filter(user=user, lower_name=Lower(Value(name)))
+            .exclude(pk=getattr(self.instance, "pk", None))
+        )
+        if taken.exists():
+            raise ValidationError(f"{name!r} already exists.")
+        return name
+
+
+class RecipeTagSerializer(ModelSerializer):
 
     class Meta:
         model = Tag
@@ -13,7 +53,16 @@ class TagSerializer(ModelSerializer):
         read_only_fields = ["id"]
 
 
-class IngredientSerializer(ModelSerializer):
+class TagSerializer(UniqueNameMixin, RecipeTagSerializer):
+    """Adds the recipe_count annotation of the tag viewset."""
+
+    recipe_count = IntegerField(read_only=True)
+
+    class Meta(RecipeTagSerializer.Meta):
+        fields = RecipeTagSerializer.Meta.fields + ["recipe_count"]
+
+
+class RecipeIngredientSerializer(ModelSerializer):
 
     class Meta:
         model = Ingredient
@@ -24,10 +73,65 @@ class IngredientSerializer(ModelSerializer):
         read_only_fields = ["id"]
 
 
-class RecipeSerializer(ModelSerializer):
+class IngredientSerializer(UniqueNameMixin, RecipeIngredientSerializer):
+    """Adds the recipe_count annotation of the ingredient viewset."""
+
+    recipe_count = IntegerField(read_only=True)
+
+    class Meta(RecipeIngredientSerializer.Meta):
+        fields = RecipeIngredientSerializer.Meta.fields + ["recipe_count"]
+
+
+class SparseFieldsMixin:
+    """Limit GET responses to the comma separated ?fields= names.
+
+    field_columns maps fields whose source is not a column of the same
+    name to the columns they read, so views can defer all the others.
+    """
+
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        wanted = self.selected_fields(self.context.get("request"))
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Return the field names the request asked for."""
+        names = list(cls.Meta.fields)
+        value = None
+        if request is not None and request.method == "GET":
+            value = request.query_params.get("fields")
+        if not value:
+            return set(names)
+        wanted = {name.strip() for name in value.split(",") if name.strip()}
+        unknown = wanted - set(names)
+        if unknown:
+            raise ValidationError(
+                {"fields": [f"Unknown fields: {', '.join(sorted(unknown))}."]}
+            )
+        return wanted
+
+    @classmethod
+    def model_columns(cls, names):
+        """Return the model columns needed to render the named fields."""
+        meta = cls.Meta.model._meta
+        concrete = {field.name for field in meta.concrete_fields}
+        columns = {meta.pk.name}
+        for name in names:
+            columns.update(cls.field_columns.get(name, [name]))
+        return sorted(columns & concrete)
+
 
-    tags = TagSerializer(many=True, required=False)
-    ingredients = IngredientSerializer(many=True, required=False)
+class RecipeSerializer(
+    CompiledRepresentationMixin, SparseFieldsMixin, ModelSerializer
+):
+
+    tags = RecipeTagSerializer(many=True, required=False)
+    ingredients = RecipeIngredientSerializer(many=True, required=False)
+    image_variants = SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -39,41 +143,46 @@ class RecipeSerializer(ModelSerializer):
             "link",
             "tags",
             "ingredients",
+            "image_variants",
         ]
         read_only_fields = ["id"]
 
-    def _get_or_create_tags(self, tags, recipe):
-        auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(user=auth_user, **tag)
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ingr_ob, created = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient
-            )
-            recipe.ingredients.add(ingr_ob)
+    field_columns = {"image_variants": ["image_variants"]}
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_image_variants(self, recipe):
+        return variant_urls(recipe, self.context.get("request"))
+
+    def _get_or_create_attrs(self, model, items):
+        """Resolve tag/ingredient names in bulk, creating missing rows."""
+        names = [item["name"] for item in items]
+        found = get_or_create_attrs(model, self.context["request"].user, names)
+        return [found[name] for name in dict.fromkeys(names)]
+
+    def _get_or_create_tags(self, tags):
+        return self._get_or_create_attrs(Tag, tags)
+
+    def _get_or_create_ingredients(self, ingredients):
+        return self._get_or_create_attrs(Ingredient, ingredients)
 
     def create(self, validated_data):
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop("ingredients", [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        recipe.tags.add(*self._get_or_create_tags(tags))
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
         return recipe
 
     def update(self, instance, validated_data):
         tags = validated_data.pop("tags", None)
         ingredients = validated_data.pop("ingredients", None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
 
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -95,3 +204,70 @@ class ImageSerializer(ModelSerializer):
         fields = ["id", "image"]
         read_only_fields = ["id"]
         extra_kwargs = {"image": {"required": "True"}}
+
+    def validate_image(self, image):
+        # The image field only parsed the header, so size is known
+        # without decoding any pixel data.
+        width, height = image.image.size
+        if max(width, height) > settings.MAX_IMAGE_DIMENSION:
+            raise ValidationError(
+                f"Image dimensions must not exceed "
+                f"{settings.MAX_IMAGE_DIMENSION} pixels."
+            )
+        if width * height > settings.MAX_IMAGE_PIXELS:
+            raise ValidationError(
+                f"Image must not exceed {settings.MAX_IMAGE_PIXELS} pixels."
+            )
+        return image
+
+    def update(self, instance, validated_data):
+        digest = getattr(instance, "_image_content_hash", None)
+        image = validated_data.get("image")
+        if image is not None:
+            instance.image_variants = {}
+        if not (digest and image is not None):
+            return super().update(instance, validated_data)
+        ext = os.path.splitext(image.name)[1]
+        path = content_image_path(digest, ext)
+        with transaction.atomic():
+            # Held until commit, so a concurrent release of this file
+            # either finishes first or sees this recipe referencing it.
+            lock_image(path)
+            if instance.image.storage.exists(path):
+                # Identical content is already stored, reuse it.
+                validated_data.pop("image")
+                instance.image = path
+            return super().update(instance, validated_data)
+
+
+class PriceBucketSerializer(Serializer):
+    min = DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+    max = DecimalField(max_digits=None, decimal_places=2, allow_null=True)
+    count = IntegerField()
+
+
+class AttrCountSerializer(Serializer):
+    id = IntegerField()
+    name = CharField()
+    recipe_count = IntegerField()
+    rank = IntegerField()
+
+
+class RecipeStatsSerializer(Serializer):
+    count = IntegerField()
+    avg_time_minutes = FloatField(allow_null=True)
+    min_price = DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True
+    )
+    max_price = DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True
+    )
+    avg_price = DecimalField(
+        max_digits=None, decimal_places=2, allow_null=True
+    )
+    price_quartiles = ListField(
+        child=DecimalField(max_digits=None, decimal_places=2)
+    )
+    price_buckets = PriceBucketSerializer(many=True)
+    top_tags = AttrCountSerializer(many=True)
+    top_ingredients = AttrCountSerializer(many=True)
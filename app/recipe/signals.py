@@ -0,0 +1,36 @@
+"""
+Signal handlers invalidating cached recipe API responses and releasing
+images no longer used by any recipe.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_user_on_commit
+from recipe.images import release_image
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def user_data_changed(sender, instance, **kwargs):
+    invalidate_user_on_commit(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, **kwargs):
+    if action.startswith("post_"):
+        invalidate_user_on_commit(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    if instance.image:
+        image_name, variants = instance.image.name, instance.image_variants
+        transaction.on_commit(lambda: release_image(image_name, variants))
@@ -0,0 +1,113 @@
+"""
+Aggregated statistics over a recipe queryset, computed in one query.
+"""
+
+from django.db import connections
+
+from core.models import Recipe
+
+ATTR_FIELDS = ["tags", "ingredients"]
+
+STATS_SQL = """
+WITH recipes AS ({recipes}),
+summary AS (
+    SELECT
+        count(*) AS count,
+        avg(time_minutes) AS avg_time_minutes,
+        min(price) AS min_price,
+        max(price) AS max_price,
+        avg(price) AS avg_price,
+        percentile_cont(ARRAY[0.25, 0.5, 0.75])
+            WITHIN GROUP (ORDER BY price) AS price_quartiles
+    FROM recipes
+),
+price_buckets AS (
+    SELECT width_bucket(price, %s::numeric[]) AS bucket, count(*) AS count
+    FROM recipes
+    GROUP BY bucket
+){attr_ctes}
+SELECT
+    summary.*,
+    (
+        SELECT coalesce(json_object_agg(bucket, count), '{{}}')
+        FROM price_buckets
+    ) AS price_buckets{attr_columns}
+FROM summary
+"""
+
+ATTR_CTE = """,
+top_{field} AS (
+    SELECT
+        attr.id,
+        attr.name,
+        count(*) AS recipe_count,
+        rank() OVER (ORDER BY count(*) DESC) AS rank
+    FROM recipes
+    JOIN {through} link ON link.{source} = recipes.id
+    JOIN {table} attr ON attr.id = link.{target}
+    GROUP BY attr.id, attr.name
+    ORDER BY recipe_count DESC, attr.name
+    LIMIT %s
+)"""
+
+ATTR_COLUMN = """,
+    (
+        SELECT coalesce(json_agg(top_{field} ORDER BY rank, name), '[]')
+        FROM top_{field}
+    ) AS top_{field}"""
+
+
+def _attr_sql(field, quote):
+    m2m = Recipe._meta.get_field(field)
+    return ATTR_CTE.format(
+        field=field,
+        through=quote(m2m.remote_field.through._meta.db_table),
+        source=quote(m2m.m2m_column_name()),
+        target=quote(m2m.m2m_reverse_name()),
+        table=quote(m2m.related_model._meta.db_table),
+    )
+
+
+def _buckets(edges, counts):
+    """Expand width_bucket indexes into [{min, max, count}, ...]."""
+    bounds = [None, *edges, None]
+    return [
+        {
+            "min": bounds[index],
+            "max": bounds[index + 1],
+            "count": counts.get(str(index), 0),
+        }
+        for index in range(len(edges) + 1)
+    ]
+
+
+def recipe_stats(queryset, price_edges, top):
+    """Summarise the recipes in queryset.
+
+    Returns counts, average time, price summary and distribution over
+    the price_edges buckets, and the top tags/ingredients ranked by how
+    many of the recipes use them.
+    """
+    connection = connections[queryset.db]
+    quote = connection.ops.quote_name
+    recipes, params = (
+        queryset.order_by()
+        .values("id", "time_minutes", "price")
+        .query.sql_with_params()
+    )
+    sql = STATS_SQL.format(
+        recipes=recipes,
+        attr_ctes="".join(_attr_sql(field, quote) for field in ATTR_FIELDS),
+        attr_columns="".join(
+            ATTR_COLUMN.format(field=field) for field in ATTR_FIELDS
+        ),
+    )
+    params = [*params, list(price_edges), *[top] * len(ATTR_FIELDS)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        stats = dict(zip(columns, cursor.fetchone()))
+
+    stats["price_quartiles"] = stats["price_quartiles"] or []
+    stats["price_buckets"] = _buckets(price_edges, stats["price_buckets"])
+    return stats
@@ -1,5 +1,6 @@
 from django.test import TestCase
 from django.urls import reverse
+from django.db.models import Count
 
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -12,6 +13,7 @@ from recipe.serializers import IngredientSerializer
 from decimal import Decimal
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+AUTOCOMPLETE_URL = reverse("recipe:ingredient-autocomplete")
 
 
 def create_user(email="test@example.com", password="testpass123"):
@@ -22,6 +24,10 @@ def get_ingredient_url(id):
     return reverse("recipe:ingredient-detail", args=[id])
 
 
+def with_counts(queryset):
+    return queryset.annotate(recipe_count=Count("recipe"))
+
+
 class PublicIngredientsTests(TestCase):
 
     def setUp(self):
@@ -44,10 +50,10 @@ class PrivateIngredientsTests(TestCase):
         Ingredient.objects.create(user=self.user, name="test2")
         res = self.client.get(INGREDIENTS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        ingredients = Ingredient.objects.all().order_by("-name")
+        ingredients = with_counts(Ingredient.objects.all()).order_by("-name")
         serializer = IngredientSerializer(ingredients, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         new_user = create_user()
@@ -56,9 +62,11 @@ class PrivateIngredientsTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        serializer = IngredientSerializer(tag1)
-        self.assertIn(serializer.data, res.data)
+        self.assertEqual(len(res.data["results"]), 1)
+        serializer = IngredientSerializer(
+            with_counts(Ingredient.objects).get(id=tag1.id)
+        )
+        self.assertIn(serializer.data, res.data["results"])
 
     def test_update_ingredient(self):
         ingredient = Ingredient.objects.create(user=self.user, name="test")
@@ -75,7 +83,7 @@ class PrivateIngredientsTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
 
         url = get_ingredient_url(ingredient.id)
         res = self.client.delete(url)
@@ -97,12 +105,16 @@ class PrivateIngredientsTests(TestCase):
             price=Decimal("5.00"),
         )
         rec.ingredients.add(ing1)
-        s1 = IngredientSerializer(ing1)
-        s2 = IngredientSerializer(ing2)
+        s1 = IngredientSerializer(
+            with_counts(Ingredient.objects).get(id=ing1.id)
+        )
+        s2 = IngredientSerializer(
+            with_counts(Ingredient.objects).get(id=ing2.id)
+        )
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
 
     def test_distinct_ingredients(self):
         ing1 = Ingredient.objects.create(user=self.user, name="test1")
@@ -124,4 +136,33 @@ class PrivateIngredientsTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_recipe_count_and_min_count(self):
+        salt = Ingredient.objects.create(user=self.user, name="salt")
+        Ingredient.objects.create(user=self.user, name="saffron")
+        for title in ("soup", "stew"):
+            rec = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=Decimal("5.00"),
+            )
+            rec.ingredients.add(salt)
+
+        res = self.client.get(INGREDIENTS_URL, {"min_count": 1})
+
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], "salt")
+        self.assertEqual(res.data["results"][0]["recipe_count"], 2)
+
+    def test_autocomplete(self):
+        for name in ("Tomato", "Tomatillo", "Potato", "Salt"):
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "tom"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["name"] for item in res.data], ["Tomatillo", "Tomato"]
+        )
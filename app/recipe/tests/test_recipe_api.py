@@ -1,24 +1,47 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection, transaction
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
 
 from decimal import Decimal
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+    content_image_path,
+    is_content_addressed,
+)
 
+from recipe import bulk, images
+from recipe.images import lock_image, release_image
 from recipe.serializers import (
     RecipeSerializer,
     RecipeDetailSerializer,
 )
 
+import csv
+import io
+import json
+import msgpack
 import tempfile
 import os
+import struct
+import threading
+import zlib
+from unittest.mock import patch
 from PIL import Image
 
 RECIPES_URL = reverse("recipe:recipe-list")
+BULK_URL = reverse("recipe:recipe-bulk")
+EXPORT_URL = reverse("recipe:recipe-export")
+STATS_URL = reverse("recipe:recipe-stats")
 
 
 def get_recipe(recipe_id):
@@ -29,6 +52,24 @@ def get_image(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
+def make_png_header(width, height):
+    """Build a tiny PNG that only declares the given dimensions."""
+
+    def chunk(kind, data):
+        crc = zlib.crc32(kind + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(
+            ">I", crc
+        )
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", zlib.compress(b""))
+        + chunk(b"IEND", b"")
+    )
+
+
 def create_user(email, password):
     return get_user_model().objects.create(email=email, password=password)
 
@@ -73,7 +114,7 @@ class PrivateRecipeTest(TestCase):
         recipes = Recipe.objects.all().order_by("-id")
         serializer = RecipeSerializer(recipes, many=True)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
     def test_recipe_list_limited_to_user(self):
@@ -89,7 +130,7 @@ class PrivateRecipeTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_get_recipe_detail(self):
         recipe = create_recipe(user=self.user)
@@ -112,6 +153,31 @@ class PrivateRecipeTest(TestCase):
             self.assertEqual(getattr(recipe, k), v)
         self.assertEqual(recipe.user, self.user)
 
+    def test_create_and_list_recipe_msgpack(self):
+        payload = {"title": "packed", "time_minutes": 5, "price": "12.34"}
+        res = self.client.post(
+            RECIPES_URL,
+            msgpack.packb(payload),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res["Content-Type"], "application/msgpack")
+        created = msgpack.unpackb(res.content)
+        self.assertEqual(created["price"], "12.34")
+        recipe = Recipe.objects.get(id=created["id"])
+        self.assertEqual(recipe.price, Decimal("12.34"))
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        listed = msgpack.unpackb(res.content)
+        self.assertEqual(
+            listed["results"],
+            json.loads(json.dumps(RecipeSerializer([recipe], many=True).data)),
+        )
+
     def test_partial_update(self):
         link = "http://example.com/example.pdf"
         payload = {
@@ -220,6 +286,21 @@ class PrivateRecipeTest(TestCase):
                 ).exists()
             )
 
+    def test_existing_tag_matched_ignoring_case(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        payload = {
+            "title": "test",
+            "time_minutes": 30,
+            "price": Decimal("5.50"),
+            "tags": [{"name": "vegan"}, {"name": "VEGAN"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_creating_tags_on_patch(self):
         recipe = create_recipe(user=self.user)
         payload = {"tags": [{"name": "test"}]}
@@ -325,6 +406,68 @@ class PrivateRecipeTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_many_ingredients_query_count(self):
+        Ingredient.objects.create(user=self.user, name="ing0")
+        payload = {
+            "title": "test",
+            "time_minutes": 30,
+            "price": Decimal("5.50"),
+            "tags": [{"name": f"tag{i}"} for i in range(30)],
+            "ingredients": [{"name": f"ing{i}"} for i in range(30)],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(queries), 20)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 30)
+
+    def test_update_tags_keeps_existing_links(self):
+        tag1 = Tag.objects.create(user=self.user, name="test1")
+        tag2 = Tag.objects.create(user=self.user, name="test2")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+        through = Recipe.tags.through
+        link = through.objects.get(recipe=recipe, tag=tag1)
+
+        payload = {"tags": [{"name": "test1"}, {"name": "test3"}]}
+        res = self.client.patch(get_recipe(recipe.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(through.objects.filter(id=link.id).exists())
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)),
+            {"test1", "test3"},
+        )
+
+    def test_duplicate_names_in_payload(self):
+        payload = {
+            "title": "test",
+            "time_minutes": 30,
+            "price": Decimal("5.50"),
+            "tags": [{"name": "test"}, {"name": "test"}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_existing_non_ascii_tag_reused(self):
+        payload = {
+            "title": "test",
+            "time_minutes": 30,
+            "price": Decimal("5.50"),
+            "tags": [{"name": "İzmir"}, {"name": "ÉPICE"}],
+        }
+        for _ in range(2):
+            res = self.client.post(RECIPES_URL, payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
     def test_filtering_by_tags(self):
         r1 = create_recipe(user=self.user, title="recipe1")
         r2 = create_recipe(user=self.user, title="recipe2")
@@ -342,9 +485,9 @@ class PrivateRecipeTest(TestCase):
         res = self.client.get(RECIPES_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
 
     def test_filtering_by_ingredients(self):
         r1 = create_recipe(user=self.user, title="recipe1")
@@ -363,9 +506,597 @@ class PrivateRecipeTest(TestCase):
         res = self.client.get(RECIPES_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertIn(s2.data, res.data["results"])
+        self.assertNotIn(s3.data, res.data["results"])
+
+    def test_filtering_by_all_tags(self):
+        tag1 = Tag.objects.create(user=self.user, name="tag1")
+        tag2 = Tag.objects.create(user=self.user, name="tag2")
+        r1 = create_recipe(user=self.user, title="recipe1")
+        r2 = create_recipe(user=self.user, title="recipe2")
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+
+        payload = {"tags": f"{tag1.id},{tag2.id}", "match": "all"}
+        res = self.client.get(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in res.data["results"]]
+        self.assertEqual(ids, [r1.id])
+
+    def test_filtering_by_any_tags_no_duplicates(self):
+        tag1 = Tag.objects.create(user=self.user, name="tag1")
+        tag2 = Tag.objects.create(user=self.user, name="tag2")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+
+        payload = {"tags": f"{tag1.id},{tag2.id}"}
+        res = self.client.get(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in res.data["results"]]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_search_recipes(self):
+        r1 = create_recipe(user=self.user, title="Tomato soup")
+        r2 = create_recipe(
+            user=self.user, title="Pasta", description="With tomato sauce"
+        )
+        r3 = create_recipe(user=self.user, title="Pancakes")
+        egg = Ingredient.objects.create(user=self.user, name="egg")
+        r3.ingredients.add(egg)
+
+        res = self.client.get(RECIPES_URL, {"search": "tomato"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [item["id"] for item in res.data["results"]]
+        self.assertEqual(ids, [r1.id, r2.id])
+
+    def test_search_by_tag_and_ingredient_names(self):
+        recipe = create_recipe(user=self.user, title="Salad")
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        recipe.tags.add(tag)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="cucumber")
+        )
+        create_recipe(user=self.user, title="Steak")
+
+        for term in ("vegan", "cucumber"):
+            res = self.client.get(RECIPES_URL, {"search": term})
+            ids = [item["id"] for item in res.data["results"]]
+            self.assertEqual(ids, [recipe.id])
+
+        tag.name = "raw"
+        tag.save()
+        res = self.client.get(RECIPES_URL, {"search": "raw"})
+        self.assertEqual(len(res.data["results"]), 1)
+        recipe.tags.clear()
+        res = self.client.get(RECIPES_URL, {"search": "raw"})
+        self.assertEqual(len(res.data["results"]), 0)
+
+    def test_search_paginated(self):
+        for i in range(3):
+            create_recipe(user=self.user, title=f"Bread {i}")
+
+        res = self.client.get(RECIPES_URL, {"search": "bread", "page_size": 2})
+        ids = [item["id"] for item in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        ids.extend(item["id"] for item in res.data["results"])
+
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_search_paginated_distinct_ranks(self):
+        recipes = [
+            create_recipe(
+                user=self.user,
+                title="Bread",
+                description=" ".join(["bread"] * i + ["crumb"] * (40 - i)),
+            )
+            for i in range(40)
+        ]
+
+        ids = []
+        res = self.client.get(RECIPES_URL, {"search": "bread", "page_size": 3})
+        for _ in range(14):
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item["id"] for item in res.data["results"])
+            if res.data["next"] is None:
+                break
+            res = self.client.get(res.data["next"])
+
+        self.assertIsNone(res.data["next"])
+
+        self.assertEqual(len(ids), len(recipes))
+        self.assertEqual(set(ids), {recipe.id for recipe in recipes})
+
+    def test_list_query_count_constant(self):
+        for count in (1, 10):
+            Recipe.objects.all().delete()
+            for i in range(count):
+                recipe = create_recipe(user=self.user, title=f"recipe{i}")
+                recipe.tags.add(
+                    Tag.objects.create(user=self.user, name=f"tag{count}-{i}")
+                )
+                recipe.ingredients.add(
+                    Ingredient.objects.create(
+                        user=self.user, name=f"ing{count}-{i}"
+                    )
+                )
+
+            with self.assertNumQueries(3):
+                res = self.client.get(RECIPES_URL)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data["results"]), count)
+
+    def test_list_sparse_fields(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {"fields": "id,title"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["results"], [{"id": recipe.id, "title": recipe.title}]
+        )
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"]
+        self.assertNotIn('"core_recipe"."price"', sql)
+        self.assertNotIn('"core_recipe"."image_variants"', sql)
+
+    def test_list_sparse_fields_with_nested(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {"fields": "id, tags"})
+
+        self.assertEqual(set(res.data["results"][0]), {"id", "tags"})
+        self.assertEqual(res.data["results"][0]["tags"][0]["name"], "tag")
+
+    def test_list_defers_unrendered_columns(self):
+        create_recipe(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+
+        self.assertNotIn('"core_recipe"."description"', queries[0]["sql"])
+        self.assertNotIn('"core_recipe"."search_vector"', queries[0]["sql"])
+
+    def test_sparse_fields_unknown(self):
+        res = self.client.get(RECIPES_URL, {"fields": "id,secret"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", res.data)
+
+    def test_detail_sparse_fields(self):
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(
+            get_recipe(recipe.id), {"fields": "description"}
+        )
+
+        self.assertEqual(res.data, {"description": recipe.description})
+
+    def test_sparse_fields_ignored_on_write(self):
+        payload = {"title": "t", "time_minutes": 1, "price": "1.00"}
+
+        res = self.client.post(f"{RECIPES_URL}?fields=id", payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["title"], "t")
+
+    def test_detail_query_count(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="ing")
+        )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(get_recipe(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["tags"]), 1)
+
+    def test_list_paginated_by_cursor(self):
+        recipes = [
+            create_recipe(user=self.user, title=f"recipe{i}") for i in range(5)
+        ]
+
+        res = self.client.get(RECIPES_URL, {"page_size": 2})
+        ids = [item["id"] for item in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            ids.extend(item["id"] for item in res.data["results"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids, [r.id for r in reversed(recipes)])
+
+
+class BulkRecipeTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "bulk@example.com", "testpass123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        Tag.objects.create(user=self.user, name="vegan")
+        payload = [
+            {
+                "title": f"recipe{i}",
+                "time_minutes": 10,
+                "price": "5.00",
+                "tags": [{"name": "vegan"}, {"name": f"tag{i}"}],
+                "ingredients": [{"name": "salt"}],
+            }
+            for i in range(20)
+        ]
+        payload.insert(1, {"title": "missing fields"})
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertLess(len(queries), 20)
+        results = res.data["results"]
+        self.assertEqual(len(results), 21)
+        self.assertEqual(results[1]["status"], 400)
+        self.assertIn("time_minutes", results[1]["errors"])
+        created = [r["id"] for r in results if r["status"] == 201]
+        self.assertEqual(len(created), 20)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 21)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        recipe = Recipe.objects.get(id=results[0]["id"])
+        self.assertEqual(recipe.user, self.user)
+        self.assertEqual(
+            set(recipe.tags.values_list("name", flat=True)), {"vegan", "tag0"}
+        )
+
+        res = self.client.get(RECIPES_URL, {"search": "tag0"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_bulk_update(self):
+        r1 = create_recipe(user=self.user, title="one")
+        r2 = create_recipe(user=self.user, title="two")
+        old = Tag.objects.create(user=self.user, name="old")
+        r1.tags.add(old)
+        other = create_recipe(
+            user=create_user("other@example.com", "testpass123")
+        )
+        self.client.get(RECIPES_URL)
+
+        payload = [
+            {"id": r1.id, "title": "one!", "tags": [{"name": "new"}]},
+            {"id": r2.id, "price": "9.99"},
+            {"id": other.id, "title": "stolen"},
+            {"id": r2.id, "time_minutes": -1.5},
+        ]
+        res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [r["status"] for r in res.data["results"]]
+        self.assertEqual(statuses, [200, 200, 404, 400])
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(r1.title, "one!")
+        self.assertEqual(list(r1.tags.values_list("name", flat=True)), ["new"])
+        self.assertEqual(r2.price, Decimal("9.99"))
+        self.assertEqual(r2.title, "two")
+        self.assertNotEqual(other.title, "stolen")
+
+        res = self.client.get(RECIPES_URL)
+        titles = {r["title"] for r in res.data["results"]}
+        self.assertIn("one!", titles)
+
+    def test_bulk_update_keeps_concurrent_changes(self):
+        r1 = create_recipe(user=self.user, title="one")
+        r2 = create_recipe(user=self.user, title="two")
+        split_attrs = bulk._split_attrs
+
+        def concurrent_write(data):
+            # Another request commits after the rows were read.
+            Recipe.objects.filter(id=r1.id).update(price=Decimal("7.00"))
+            Recipe.objects.filter(id=r2.id).update(title="renamed")
+            return split_attrs(data)
+
+        payload = [
+            {"id": r1.id, "title": "one!"},
+            {"id": r2.id, "price": "9.99"},
+        ]
+        with patch("recipe.bulk._split_attrs", side_effect=concurrent_write):
+            res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual((r1.title, r1.price), ("one!", Decimal("7.00")))
+        self.assertEqual((r2.title, r2.price), ("renamed", Decimal("9.99")))
+
+    def test_bulk_delete(self):
+        r1 = create_recipe(user=self.user)
+        other = create_recipe(
+            user=create_user("other@example.com", "testpass123")
+        )
+
+        res = self.client.delete(BULK_URL, [r1.id, other.id], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        statuses = [r["status"] for r in res.data["results"]]
+        self.assertEqual(statuses, [204, 404])
+        self.assertFalse(Recipe.objects.filter(id=r1.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_bulk_requires_list(self):
+        res = self.client.post(BULK_URL, {"title": "x"}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(BULK_MAX_ITEMS=2)
+    def test_bulk_limit(self):
+        res = self.client.delete(BULK_URL, [1, 2, 3], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportRecipeTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "export@example.com", "testpass123"
+        )
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            create_recipe(user=self.user, title=f"recipe{i}")
+            for i in range(5)
+        ]
+        tag = Tag.objects.create(user=self.user, name="vegan")
+        salt = Ingredient.objects.create(user=self.user, name="salt")
+        pepper = Ingredient.objects.create(user=self.user, name="pepper")
+        self.recipes[0].tags.add(tag)
+        self.recipes[0].ingredients.add(salt, pepper)
+        create_recipe(user=create_user("other@example.com", "testpass123"))
+
+    def _content(self, res):
+        return b"".join(res.streaming_content).decode()
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_ndjson(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in self._content(res).splitlines()]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [recipe.id for recipe in reversed(self.recipes)],
+        )
+        first = rows[-1]
+        serializer = RecipeDetailSerializer(self.recipes[0])
+        for field in ("title", "description", "price", "tags"):
+            self.assertEqual(first[field], serializer.data[field])
+        self.assertEqual(
+            [item["name"] for item in first["ingredients"]],
+            ["salt", "pepper"],
+        )
+
+    def test_export_csv(self):
+        res = self.client.get(EXPORT_URL, {"format": "csv"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/csv"))
+        rows = list(csv.DictReader(io.StringIO(self._content(res))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1]["tags"], "vegan")
+        self.assertEqual(rows[-1]["ingredients"], "salt|pepper")
+        self.assertEqual(rows[-1]["price"], "5.55")
+
+    def test_export_applies_filters(self):
+        res = self.client.get(EXPORT_URL, {"search": "recipe3"})
+
+        rows = self._content(res).splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0])["id"], self.recipes[3].id)
+
+
+class CachedRecipeListTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "cache@example.com", "testpass123"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_served_from_cache(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached["ETag"], res["ETag"])
+
+    def test_not_modified_with_etag(self):
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                RECIPES_URL, HTTP_IF_NONE_MATCH=res["ETag"]
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_not_modified_with_compressed_etag(self):
+        for i in range(20):
+            create_recipe(user=self.user, title=f"recipe {i}")
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertTrue(res["ETag"].startswith("W/"))
+
+        res = self.client.get(
+            RECIPES_URL,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=res["ETag"],
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_cache_varies_by_query_params(self):
+        tag = Tag.objects.create(user=self.user, name="tag")
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag)
+        create_recipe(user=self.user)
+
+        res_all = self.client.get(RECIPES_URL)
+        res_tag = self.client.get(RECIPES_URL, {"tags": str(tag.id)})
+
+        self.assertEqual(len(res_all.data["results"]), 2)
+        self.assertEqual(len(res_tag.data["results"]), 1)
+        self.assertNotEqual(res_all["ETag"], res_tag["ETag"])
+
+    def test_write_invalidates_cache(self):
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res["ETag"]
+
+        recipe.tags.add(Tag.objects.create(user=self.user, name="tag"))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(len(res.data["results"][0]["tags"]), 1)
+
+        Recipe.objects.filter(id=recipe.id).delete()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.data["results"], [])
+
+    def test_cache_limited_to_user(self):
+        other = get_user_model().objects.create_user(
+            "other@example.com", "testpass123"
+        )
+        create_recipe(user=self.user)
+        self.client.get(RECIPES_URL)
+
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.data["results"], [])
+
+
+class StatsRecipeTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "stats@example.com", "testpass123"
+        )
+        self.client.force_authenticate(self.user)
+
+    @override_settings(RECIPE_STATS_PRICE_EDGES=[5, 10])
+    def test_stats(self):
+        vegan = Tag.objects.create(user=self.user, name="Vegan")
+        quick = Tag.objects.create(user=self.user, name="Quick")
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        for minutes, price, tags in [
+            (10, "2.00", [vegan, quick]),
+            (20, "6.00", [vegan]),
+            (30, "8.00", [vegan]),
+            (60, "20.00", []),
+        ]:
+            recipe = create_recipe(
+                user=self.user, time_minutes=minutes, price=Decimal(price)
+            )
+            recipe.tags.add(*tags)
+        recipe.ingredients.add(salt)
+        create_recipe(user=create_user("other@example.com", "pass123"))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 4)
+        self.assertEqual(res.data["avg_time_minutes"], 30.0)
+        self.assertEqual(res.data["min_price"], "2.00")
+        self.assertEqual(res.data["max_price"], "20.00")
+        self.assertEqual(res.data["avg_price"], "9.00")
+        self.assertEqual(
+            res.data["price_quartiles"], ["5.00", "7.00", "11.00"]
+        )
+        self.assertEqual(
+            [dict(bucket) for bucket in res.data["price_buckets"]],
+            [
+                {"min": None, "max": "5.00", "count": 1},
+                {"min": "5.00", "max": "10.00", "count": 2},
+                {"min": "10.00", "max": None, "count": 1},
+            ],
+        )
+        self.assertEqual(
+            [
+                {key: tag[key] for key in ("id", "name", "recipe_count")}
+                for tag in res.data["top_tags"]
+            ],
+            [
+                {"id": vegan.id, "name": "Vegan", "recipe_count": 3},
+                {"id": quick.id, "name": "Quick", "recipe_count": 1},
+            ],
+        )
+        self.assertEqual([t["rank"] for t in res.data["top_tags"]], [1, 2])
+        self.assertEqual(
+            [tag["name"] for tag in res.data["top_ingredients"]], ["Salt"]
+        )
+
+    def test_stats_empty(self):
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 0)
+        self.assertIsNone(res.data["avg_price"])
+        self.assertEqual(res.data["price_quartiles"], [])
+        self.assertEqual(res.data["top_tags"], [])
+
+    def test_stats_filters_and_top(self):
+        tags = [
+            Tag.objects.create(user=self.user, name=f"tag{i}")
+            for i in range(3)
+        ]
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(*tags)
+        create_recipe(user=self.user)
+
+        res = self.client.get(STATS_URL, {"tags": str(tags[0].id), "top": 2})
+
+        self.assertEqual(res.data["count"], 1)
+        self.assertEqual(
+            [tag["name"] for tag in res.data["top_tags"]], ["tag0", "tag1"]
+        )
+
+    def test_stats_invalid_top(self):
+        res = self.client.get(STATS_URL, {"top": "many"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_cached_until_write(self):
+        create_recipe(user=self.user)
+        self.client.get(STATS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["count"], 1)
+
+        create_recipe(user=self.user)
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.data["count"], 2)
 
 
 class ImageRecipeTest(TestCase):
@@ -379,8 +1110,24 @@ class ImageRecipeTest(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        storage = self.recipe.image.storage
+        for path in self.recipe.image_variants.values():
+            storage.delete(path)
         self.recipe.image.delete()
 
+    def _upload(self, size=(10, 10)):
+        url = get_image(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
+            img = Image.new("RGB", size)
+            img.save(image_file, format="JPEG")
+            image_file.seek(0)
+            payload = {"image": image_file}
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(url, payload, format="multipart")
+        self.recipe.refresh_from_db()
+        return res
+
     def test_upload_images(self):
         url = get_image(self.recipe.id)
         with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
@@ -402,3 +1149,217 @@ class ImageRecipeTest(TestCase):
         res = self.client.post(url, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_VARIANT_BACKEND="sync")
+    def test_upload_generates_variants(self):
+        res = self._upload(size=(1200, 900))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(self.recipe.image_variants), set(settings.IMAGE_VARIANTS)
+        )
+        storage = self.recipe.image.storage
+        for name, path in self.recipe.image_variants.items():
+            with storage.open(path) as variant_file:
+                with Image.open(variant_file) as variant:
+                    limit = settings.IMAGE_VARIANTS[name]
+                    self.assertLessEqual(variant.width, limit[0])
+                    self.assertLessEqual(variant.height, limit[1])
+
+        res = self.client.get(get_recipe(self.recipe.id))
+        self.assertEqual(
+            set(res.data["image_variants"]), set(settings.IMAGE_VARIANTS)
+        )
+
+    @override_settings(IMAGE_VARIANT_BACKEND="sync")
+    def test_variants_follow_exif_orientation(self):
+        # Phones store portrait photos landscape with Orientation=6.
+        buffer = io.BytesIO()
+        img = Image.new("RGB", (400, 200))
+        exif = img.getexif()
+        exif[0x0112] = 6
+        img.save(buffer, format="JPEG", exif=exif.tobytes())
+        image = SimpleUploadedFile("phone.jpg", buffer.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                get_image(self.recipe.id), {"image": image}, format="multipart"
+            )
+        self.recipe.refresh_from_db()
+
+        path = self.recipe.image_variants["thumbnail"]
+        with self.recipe.image.storage.open(path) as variant_file:
+            with Image.open(variant_file) as variant:
+                self.assertEqual(variant.size, (100, 200))
+
+    @patch("recipe.images._get_executor")
+    def test_upload_schedules_variants_in_worker(self, mock_executor):
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        mock_executor.return_value.submit.assert_called_once()
+        self.assertEqual(self.recipe.image_variants, {})
+
+    @patch("recipe.images.close_old_connections")
+    @patch(
+        "recipe.images.generate_variants", side_effect=OSError("disk full")
+    )
+    def test_worker_failure_logged(self, mock_generate, mock_close):
+        with self.assertLogs("recipe.images", "ERROR") as logs:
+            images._run_in_worker(self.recipe.id)
+
+        self.assertIn(str(self.recipe.id), logs.output[0])
+        self.assertIn("disk full", logs.output[0])
+
+    def _post_png(self, width, height):
+        image = SimpleUploadedFile(
+            "big.png", make_png_header(width, height), "image/png"
+        )
+        return self.client.post(
+            get_image(self.recipe.id), {"image": image}, format="multipart"
+        )
+
+    def test_upload_rejects_large_dimensions(self):
+        res = self._post_png(settings.MAX_IMAGE_DIMENSION + 1, 10)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("dimensions", str(res.data["image"]))
+
+    def test_upload_rejects_too_many_pixels(self):
+        side = int(settings.MAX_IMAGE_PIXELS**0.5) + 1
+        res = self._post_png(side, side)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("pixels", str(res.data["image"]))
+
+    def test_upload_rejects_decompression_bomb(self):
+        res = self._post_png(30000, 30000)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=1024)
+    def test_upload_rejects_large_file(self):
+        img = Image.frombytes("RGB", (100, 100), os.urandom(30000))
+        with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+            img.save(image_file, format="PNG")
+            image_file.seek(0)
+            res = self.client.post(
+                get_image(self.recipe.id),
+                {"image": image_file},
+                format="multipart",
+            )
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def _post_jpeg(self, recipe, color):
+        buffer = io.BytesIO()
+        Image.new("RGB", (20, 20), color).save(buffer, format="JPEG")
+        image = SimpleUploadedFile("photo.JPG", buffer.getvalue())
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                get_image(recipe.id), {"image": image}, format="multipart"
+            )
+
+    @override_settings(
+        IMAGE_STORAGE_MODE="content", IMAGE_VARIANT_BACKEND="sync"
+    )
+    def test_content_addressed_upload_deduplicates(self):
+        other = create_recipe(user=self.user)
+        res1 = self._post_jpeg(self.recipe, "red")
+        res2 = self._post_jpeg(other, "red")
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+
+        self.assertEqual(res1.status_code, status.HTTP_200_OK)
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertTrue(is_content_addressed(self.recipe.image.name))
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        self.assertTrue(self.recipe.image.name.endswith(".jpg"))
+        self.assertEqual(self.recipe.image_variants, other.image_variants)
+
+        path = self.recipe.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertTrue(os.path.exists(path))
+
+        variants = list(self.recipe.image_variants.values())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertFalse(os.path.exists(path))
+        storage = self.recipe.image.storage
+        for variant in variants:
+            self.assertFalse(storage.exists(variant))
+        self.recipe = create_recipe(user=self.user)
+
+    @override_settings(IMAGE_VARIANT_BACKEND="sync")
+    def test_replaced_image_released(self):
+        self._post_jpeg(self.recipe, "red")
+        self.recipe.refresh_from_db()
+        old_path = self.recipe.image.path
+        old_variants = list(self.recipe.image_variants.values())
+
+        self._post_jpeg(self.recipe, "blue")
+        self.recipe.refresh_from_db()
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+        storage = self.recipe.image.storage
+        for variant in old_variants:
+            self.assertFalse(storage.exists(variant))
+
+
+class ImageReleaseLockTest(TransactionTestCase):
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            "lock@example.com", "testpass123"
+        )
+        self.recipe = create_recipe(user=user)
+        self.storage = Recipe._meta.get_field("image").storage
+        self.path = content_image_path("ab" * 32, ".jpg")
+        self.storage.delete(self.path)
+        self.assertEqual(
+            self.storage.save(self.path, io.BytesIO(b"jpeg")), self.path
+        )
+        self.addCleanup(self.storage.delete, self.path)
+
+    def _in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_release_waits_for_concurrent_reuse(self):
+        locked, reused = threading.Event(), threading.Event()
+
+        def reuse():
+            with transaction.atomic():
+                lock_image(self.path)
+                locked.set()
+                Recipe.objects.filter(id=self.recipe.id).update(
+                    image=self.path
+                )
+                reused.wait(5)
+
+        reuser = self._in_thread(reuse)
+        self.assertTrue(locked.wait(5))
+        releaser = self._in_thread(lambda: release_image(self.path, {}))
+        releaser.join(0.3)
+        self.assertTrue(releaser.is_alive())
+
+        reused.set()
+        reuser.join(5)
+        releaser.join(5)
+
+        self.assertFalse(releaser.is_alive())
+        self.assertTrue(self.storage.exists(self.path))
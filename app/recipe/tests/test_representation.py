@@ -0,0 +1,111 @@
+"""
+Parity tests for the compiled serializer representation.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.serializers import ModelSerializer, Serializer
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.representation import (
+    CompiledRepresentationMixin,
+    compile_representation,
+)
+from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+def reference(serializer, instances):
+    """Render with DRF's own Serializer.to_representation."""
+    return [Serializer.to_representation(serializer, obj) for obj in instances]
+
+
+class CompiledRepresentationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            "parity@example.com", "testpass123"
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ("Vegan", "Süß", 'Quote "tag"')
+        ]
+        salt = Ingredient.objects.create(user=self.user, name="Salt")
+        samples = [
+            {"price": Decimal("5.5"), "link": ""},
+            {"price": Decimal("0.01"), "title": "Crème brûlée 🍮"},
+            {"price": Decimal("999.99"), "description": ""},
+            {
+                "price": Decimal("12.30"),
+                "image_variants": {"thumbnail": "uploads/a_thumbnail.webp"},
+            },
+        ]
+        for index, params in enumerate(samples):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=params.pop("title", f"recipe {index}"),
+                time_minutes=index * 7,
+                description=params.pop("description", "Line\nbreak"),
+                link=params.pop("link", "https://example.com/r"),
+                **params,
+            )
+            recipe.tags.add(*tags[:index])
+            if index % 2:
+                recipe.ingredients.add(salt)
+        self.recipes = list(
+            Recipe.objects.order_by("id").prefetch_related(
+                "tags", "ingredients"
+            )
+        )
+        self.factory = RequestFactory()
+
+    def _context(self, query=""):
+        request = Request(self.factory.get(f"/api/recipe/recipes/{query}"))
+        return {"request": request}
+
+    def _assert_parity(self, serializer_class, query=""):
+        many = serializer_class(
+            self.recipes, many=True, context=self._context(query)
+        )
+        child = many.child
+        self.assertIsNotNone(compile_representation(child))
+
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(many.data),
+            renderer.render(reference(child, self.recipes)),
+        )
+
+    def test_list_serializer_parity(self):
+        self._assert_parity(RecipeSerializer)
+
+    def test_detail_serializer_parity(self):
+        self._assert_parity(RecipeDetailSerializer)
+
+    def test_sparse_fields_parity(self):
+        self._assert_parity(RecipeSerializer, "?fields=id,price,tags")
+
+    def test_single_instance_parity(self):
+        recipe = self.recipes[-1]
+        serializer = RecipeDetailSerializer(recipe, context=self._context())
+
+        self.assertEqual(
+            JSONRenderer().render(serializer.data),
+            JSONRenderer().render(reference(serializer, [recipe])[0]),
+        )
+
+    def test_falls_back_for_non_model_sources(self):
+
+        class TitleSerializer(CompiledRepresentationMixin, ModelSerializer):
+
+            class Meta:
+                model = Recipe
+                fields = ["id", "title", "__str__"]
+
+        serializer = TitleSerializer(self.recipes[0])
+
+        self.assertIsNone(compile_representation(serializer))
+        self.assertEqual(serializer.data["__str__"], self.recipes[0].title)
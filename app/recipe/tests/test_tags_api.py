@@ -1,7 +1,11 @@
-from django.test import TestCase
+import threading
+
+from django.test import TestCase, TransactionTestCase
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection, transaction
+from django.db.models import Count
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -11,6 +15,7 @@ from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse("recipe:tag-list")
+AUTOCOMPLETE_URL = reverse("recipe:tag-autocomplete")
 
 
 def create_user(email="user3@example.com", password="testpass123"):
@@ -24,6 +29,18 @@ def detail_url(id):
     return reverse("recipe:tag-detail", args=[id])
 
 
+def with_counts(queryset):
+    return queryset.annotate(recipe_count=Count("recipe"))
+
+
+def create_recipe(user, *tags):
+    recipe = Recipe.objects.create(
+        user=user, title="recipe", time_minutes=10, price=Decimal("5.00")
+    )
+    recipe.tags.add(*tags)
+    return recipe
+
+
 class PublicTagsAPITests(TestCase):
 
     def setUp(self):
@@ -47,10 +64,10 @@ class PrivateTagsAPITests(TestCase):
         Tag.objects.create(user=self.user, name="test")
         Tag.objects.create(user=self.user, name="test1")
         res = self.client.get(TAGS_URL)
-        tags = Tag.objects.all().order_by("-name")
+        tags = with_counts(Tag.objects.all()).order_by("-name")
         serializer = TagSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data["results"], serializer.data)
 
     def test_filter_tags(self):
         new_user = create_user(email="test1@example.com")
@@ -59,9 +76,9 @@ class PrivateTagsAPITests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]["name"], tag.name)
-        self.assertEqual(res.data[0]["id"], tag.id)
+        self.assertEqual(len(res.data["results"]), 1)
+        self.assertEqual(res.data["results"][0]["name"], tag.name)
+        self.assertEqual(res.data["results"][0]["id"], tag.id)
 
     def test_update_tags(self):
         tag = Tag.objects.create(user=self.user, name="test")
@@ -71,12 +88,38 @@ class PrivateTagsAPITests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(payload["name"], tag.name)
 
+    def test_update_tag_to_existing_name_rejected(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+        tag = Tag.objects.create(user=self.user, name="test")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "VEGAN"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+
+    def test_update_tag_to_existing_non_ascii_name_rejected(self):
+        Tag.objects.create(user=self.user, name="İzmir")
+        tag = Tag.objects.create(user=self.user, name="test")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "İZMIR"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", res.data)
+
+    def test_update_tag_case_only(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+
+        res = self.client.patch(detail_url(tag.id), {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["name"], "Vegan")
+
     def test_delete_tags(self):
         tag = Tag.objects.create(user=self.user, name="test")
-        serializer = TagSerializer(tag)
+        serializer = TagSerializer(with_counts(Tag.objects).get(id=tag.id))
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serializer.data, res.data)
+        self.assertIn(serializer.data, res.data["results"])
         res = self.client.delete(detail_url(tag.id))
         tags = Tag.objects.filter(user=self.user)
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
@@ -93,12 +136,12 @@ class PrivateTagsAPITests(TestCase):
             price=Decimal("5.00"),
         )
         rec.tags.add(tag1)
-        s1 = TagSerializer(tag1)
-        s2 = TagSerializer(tag2)
+        s1 = TagSerializer(with_counts(Tag.objects).get(id=tag1.id))
+        s2 = TagSerializer(with_counts(Tag.objects).get(id=tag2.id))
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data["results"])
+        self.assertNotIn(s2.data, res.data["results"])
 
     def test_distinct_tags(self):
         tag1 = Tag.objects.create(user=self.user, name="test1")
@@ -120,4 +163,157 @@ class PrivateTagsAPITests(TestCase):
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_tags_paginated_by_cursor(self):
+        for name in ("a", "b", "c", "d"):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"page_size": 3})
+        self.assertEqual(len(res.data["results"]), 3)
+        names = [item["name"] for item in res.data["results"]]
+        res = self.client.get(res.data["next"])
+        names.extend(item["name"] for item in res.data["results"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data["next"])
+        self.assertEqual(names, ["d", "c", "b", "a"])
+
+    def test_recipe_count(self):
+        vegan = Tag.objects.create(user=self.user, name="vegan")
+        Tag.objects.create(user=self.user, name="unused")
+        create_recipe(self.user, vegan)
+        create_recipe(self.user, vegan)
+
+        res = self.client.get(TAGS_URL)
+
+        counts = {
+            tag["name"]: tag["recipe_count"] for tag in res.data["results"]
+        }
+        self.assertEqual(counts, {"vegan": 2, "unused": 0})
+
+    def test_min_count(self):
+        tags = [
+            Tag.objects.create(user=self.user, name=f"tag{i}")
+            for i in range(3)
+        ]
+        create_recipe(self.user, *tags)
+        create_recipe(self.user, tags[0], tags[1])
+
+        res = self.client.get(TAGS_URL, {"min_count": 2})
+
+        names = [tag["name"] for tag in res.data["results"]]
+        self.assertEqual(names, ["tag1", "tag0"])
+
+    def test_invalid_min_count(self):
+        res = self.client.get(TAGS_URL, {"min_count": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("min_count", res.data)
+
+    def test_order_by_recipe_count_paginated(self):
+        tags = [
+            Tag.objects.create(user=self.user, name=f"tag{i}")
+            for i in range(4)
+        ]
+        create_recipe(self.user, *tags)
+        create_recipe(self.user, tags[2])
+
+        res = self.client.get(
+            TAGS_URL, {"ordering": "-recipe_count", "page_size": 2}
+        )
+        results = res.data["results"]
+        res = self.client.get(res.data["next"])
+        results += res.data["results"]
+
+        self.assertIsNone(res.data["next"])
+        self.assertEqual(results[0]["name"], "tag2")
+        self.assertEqual(
+            [tag["recipe_count"] for tag in results], [2, 1, 1, 1]
+        )
+        self.assertEqual(len({tag["id"] for tag in results}), 4)
+
+    def test_list_query_count(self):
+        for i in range(5):
+            tag = Tag.objects.create(user=self.user, name=f"tag{i}")
+            create_recipe(self.user, tag)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data["results"]), 5)
+
+    def test_autocomplete_prefix(self):
+        for name in ("Vegan", "vegetarian", "Quick vegan", "Spicy"):
+            Tag.objects.create(user=self.user, name=name)
+        Tag.objects.create(user=create_user("o@example.com"), name="Vegan2")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "ve"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag["name"] for tag in res.data], ["Vegan", "vegetarian"]
+        )
+        self.assertEqual(set(res.data[0]), {"id", "name"})
+
+    def test_autocomplete_limit(self):
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f"tag{i}")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "TAG", "limit": 2})
+
+        self.assertEqual([tag["name"] for tag in res.data], ["tag0", "tag1"])
+
+    def test_autocomplete_escapes_wildcards(self):
+        Tag.objects.create(user=self.user, name="50% off")
+        Tag.objects.create(user=self.user, name="500g")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "50%"})
+
+        self.assertEqual([tag["name"] for tag in res.data], ["50% off"])
+
+    def test_autocomplete_empty_query(self):
+        Tag.objects.create(user=self.user, name="tag")
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": " "})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+
+class TagsCacheCommitTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get_in_other_connection(self):
+        """GET the tag list like a concurrent request would."""
+        result = {}
+
+        def run():
+            try:
+                client = APIClient()
+                client.force_authenticate(self.user)
+                result["response"] = client.get(TAGS_URL)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(10)
+        return result["response"]
+
+    def test_read_during_write_not_cached_after_commit(self):
+        tag = Tag.objects.create(user=self.user, name="vegan")
+
+        with transaction.atomic():
+            tag.delete()
+            # Sees the row deleted above, it is not committed yet.
+            res = self._get_in_other_connection()
+            self.assertEqual(len(res.data["results"]), 1)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data["results"], [])
@@ -0,0 +1,51 @@
+"""
+Upload handlers for recipe images.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class ImageSizeLimitUploadHandler(FileUploadHandler):
+    """Abort a file upload as soon as it grows past the size limit.
+
+    Installed in front of Django's default handlers, so accepted chunks
+    still stream to memory or a temporary file as usual while oversized
+    uploads are dropped before they are fully buffered.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.MAX_IMAGE_UPLOAD_SIZE
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+class ContentHashUploadHandler(FileUploadHandler):
+    """Compute a SHA-256 digest of each uploaded file as it streams in."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.digests = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self._hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        self.digests[self.field_name] = self._hasher.hexdigest()
+        return None
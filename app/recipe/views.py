@@ -1,10 +1,37 @@
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.db.models import Count, Exists, F, OuterRef, Prefetch
+from django.db.models.functions import Lower
 from core.models import Recipe, Tag, Ingredient
 from recipe import serializers
+from user.authentication import CachedTokenAuthentication
+from recipe.bulk import (
+    bulk_create_recipes,
+    bulk_delete_recipes,
+    bulk_update_recipes,
+)
+from recipe.cache import CachedListMixin
+from recipe.filters import StableOrderingFilter
+from recipe.export import iter_recipes
+from recipe.images import release_image, schedule_variants
+from recipe.renderers import CSVRenderer, NDJSONRenderer
+from recipe.stats import recipe_stats
+from recipe.uploads import (
+    ContentHashUploadHandler,
+    ImageSizeLimitUploadHandler,
+)
+from recipe.pagination import (
+    RecipeCursorPagination,
+    RecipeAttrCursorPagination,
+    RecipeSearchPagination,
+)
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -28,50 +55,245 @@ from drf_spectacular.types import OpenApiTypes
                 OpenApiTypes.STR,
                 description="Comma separeted ingredient ID to filter",
             ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR,
+                enum=["any", "all"],
+                description="any (default) to match recipes with at least \
+                    one of the given tags/ingredients, all to require every \
+                    one of them",
+            ),
+            OpenApiParameter(
+                "search",
+                OpenApiTypes.STR,
+                description="Full-text search over title, description, \
+                    tags and ingredients, results ordered by relevance and \
+                    paginated with page instead of cursor",
+            ),
+            OpenApiParameter(
+                "page",
+                OpenApiTypes.INT,
+                description="Page number of search results",
+            ),
+            OpenApiParameter(
+                "fields",
+                OpenApiTypes.STR,
+                description="Comma separated fields to return, e.g. \
+                    id,title",
+            ),
         ]
-    )
+    ),
+    retrieve=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "fields",
+                OpenApiTypes.STR,
+                description="Comma separated fields to return",
+            ),
+        ]
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(CachedListMixin, viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            request = getattr(self, "request", None)
+            if request is not None and request.query_params.get("search"):
+                self._paginator = RecipeSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def _params_to_ints(self, qs):
         return [int(num) for num in qs.split(",")]
 
+    def _nested_prefetches(self, fields):
+        """Prefetch nested tags/ingredients limited to serialized columns."""
+        return [
+            Prefetch(field, queryset=model.objects.only("id", "name"))
+            for field, model in (("tags", Tag), ("ingredients", Ingredient))
+            if field in fields
+        ]
+
+    def _filter_related(self, queryset, field, ids, match_all):
+        """Filter recipes by M2M ids with EXISTS instead of JOIN+DISTINCT."""
+        m2m = Recipe._meta.get_field(field)
+        column = f"{m2m.m2m_reverse_field_name()}__in"
+        links = m2m.remote_field.through.objects.filter(
+            **{m2m.m2m_field_name(): OuterRef("pk")}
+        )
+        if not match_all:
+            return queryset.filter(Exists(links.filter(**{column: ids})))
+        for item_id in set(ids):
+            queryset = queryset.filter(
+                Exists(links.filter(**{column: [item_id]}))
+            )
+        return queryset
+
     def get_queryset(self):
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
-        queryset = self.queryset
+        match_all = self.request.query_params.get("match") == "all"
+        queryset = self.queryset.filter(user=self.request.user)
         if tags:
             tags_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
+            queryset = self._filter_related(
+                queryset, "tags", tags_ids, match_all
+            )
         if ingredients:
             ingredients_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_ids)
+            queryset = self._filter_related(
+                queryset, "ingredients", ingredients_ids, match_all
+            )
 
-        return (
-            queryset.filter(user=self.request.user).order_by("-id").distinct()
-        )
+        queryset = queryset.order_by("-id")
+        search = self.request.query_params.get("search")
+        if search:
+            query = SearchQuery(search, search_type="websearch")
+            queryset = (
+                queryset.filter(search_vector=query)
+                .annotate(search_rank=SearchRank(F("search_vector"), query))
+                .order_by("-search_rank", "-id")
+            )
+        if self.action in ("list", "retrieve"):
+            # Only load the columns and relations the response renders.
+            serializer_class = self.get_serializer_class()
+            fields = serializer_class.selected_fields(self.request)
+            queryset = queryset.only(
+                *serializer_class.model_columns(fields)
+            ).prefetch_related(*self._nested_prefetches(fields))
+
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "list":
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.ImageSerializer
+        elif self.action == "stats":
+            return serializers.RecipeStatsSerializer
 
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        request=serializers.RecipeDetailSerializer(many=True),
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        results = bulk_create_recipes(
+            serializers.RecipeDetailSerializer,
+            request.data,
+            self.get_serializer_context(),
+        )
+        return Response({"results": results}, status.HTTP_200_OK)
+
+    @extend_schema(
+        request=serializers.RecipeDetailSerializer(many=True),
+        responses=OpenApiTypes.OBJECT,
+    )
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        results = bulk_update_recipes(
+            serializers.RecipeDetailSerializer,
+            request.data,
+            self.get_serializer_context(),
+        )
+        return Response({"results": results}, status.HTTP_200_OK)
+
+    @extend_schema(request={"application/json": {"type": "array"}})
+    @bulk.mapping.delete
+    def bulk_destroy(self, request):
+        results = bulk_delete_recipes(request.data, request.user)
+        return Response({"results": results}, status.HTTP_200_OK)
+
+    @extend_schema(
+        responses={
+            (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+            (200, CSVRenderer.media_type): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        url_path="export",
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+    )
+    def export(self, request):
+        renderer = request.accepted_renderer
+        rows = iter_recipes(self.get_queryset(), settings.EXPORT_CHUNK_SIZE)
+        response = StreamingHttpResponse(
+            renderer.stream(rows), content_type=renderer.media_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
+
+    def _build_stats(self):
+        try:
+            top = int(self.request.query_params.get("top", 5))
+        except ValueError:
+            raise ValidationError({"top": ["A valid integer is required."]})
+        top = min(max(top, 1), settings.RECIPE_STATS_MAX_TOP)
+        stats = recipe_stats(
+            self.get_queryset(), settings.RECIPE_STATS_PRICE_EDGES, top
+        )
+        return Response(self.get_serializer(stats).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "top",
+                OpenApiTypes.INT,
+                description="Number of top tags/ingredients to return",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="stats")
+    def stats(self, request):
+        """Summary of the user's recipes, honouring the list filters."""
+        return self.cached_response(request, self._build_stats)
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         recipe = self.get_object()
+        old_image, old_variants = recipe.image.name, recipe.image_variants
+        limiter = ImageSizeLimitUploadHandler(request._request)
+        request.upload_handlers.insert(0, limiter)
+        hasher = None
+        if settings.IMAGE_STORAGE_MODE == "content":
+            hasher = ContentHashUploadHandler(request._request)
+            request.upload_handlers.insert(1, hasher)
         serializer = self.get_serializer(recipe, data=request.data)
+        if limiter.exceeded:
+            return Response(
+                {
+                    "image": [
+                        f"Image file must not exceed "
+                        f"{limiter.max_size} bytes."
+                    ]
+                },
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        if hasher is not None:
+            recipe._image_content_hash = hasher.digests.get("image")
         if serializer.is_valid():
             serializer.save()
+            if recipe.image.name != old_image:
+                transaction.on_commit(
+                    lambda: release_image(old_image, old_variants)
+                )
+            transaction.on_commit(lambda: schedule_variants(recipe.id))
             return Response(serializer.data, status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -85,38 +307,102 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 enum=[0, 1],
                 description="1 if you want only assigned \
                     tags/ingredients, 0 if all",
-            )
+            ),
+            OpenApiParameter(
+                "min_count",
+                OpenApiTypes.INT,
+                description="Only tags/ingredients used by at least \
+                    this many recipes",
+            ),
         ]
     )
 )
 class BaseRecipeAttrViewSet(
+    CachedListMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
+    filter_backends = (StableOrderingFilter,)
+    ordering_fields = ("name", "recipe_count")
+    ordering = RecipeAttrCursorPagination.ordering
 
     def get_queryset(self):
         assigned_only = bool(
             int(self.request.query_params.get("assigned_only", 0))
         )
-        queryset = self.queryset
+        try:
+            min_count = int(self.request.query_params.get("min_count", 0))
+        except ValueError:
+            raise ValidationError(
+                {"min_count": ["A valid integer is required."]}
+            )
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return (
-            queryset.filter(user=self.request.user)
-            .order_by("-name")
-            .distinct()
+            min_count = max(min_count, 1)
+        # One grouped join over the M2M table, filtered with HAVING.
+        queryset = self.queryset.filter(user=self.request.user).annotate(
+            recipe_count=Count("recipe")
+        )
+        if min_count > 0:
+            queryset = queryset.filter(recipe_count__gte=min_count)
+        return queryset.order_by("-name")
+
+    def get_serializer_class(self):
+        if self.action == "autocomplete":
+            return self.autocomplete_serializer_class
+        return self.serializer_class
+
+    def _autocomplete(self):
+        query = self.request.query_params.get("q", "").strip()
+        try:
+            limit = int(self.request.query_params.get("limit", 10))
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+        limit = min(max(limit, 1), settings.AUTOCOMPLETE_MAX_LIMIT)
+        if not query:
+            return Response([])
+
+        # Served by the (user_id, lower(name) text_pattern_ops) index.
+        matches = (
+            self.queryset.filter(user=self.request.user)
+            .annotate(lower_name=Lower("name"))
+            .filter(lower_name__startswith=query.lower())
+            .order_by("lower_name", "id")[:limit]
         )
+        return Response(self.get_serializer(matches, many=True).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                OpenApiTypes.STR,
+                required=True,
+                description="Case-insensitive prefix of the names",
+            ),
+            OpenApiParameter(
+                "limit",
+                OpenApiTypes.INT,
+                description="Maximum number of suggestions",
+            ),
+        ]
+    )
+    @action(methods=["GET"], detail=False, url_path="autocomplete")
+    def autocomplete(self, request):
+        """Names starting with q, in alphabetical order."""
+        return self.cached_response(request, self._autocomplete)
 
 
 class TagsViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.TagSerializer
+    autocomplete_serializer_class = serializers.RecipeTagSerializer
     queryset = Tag.objects.all()
 
 
 class IngredientsViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
+    autocomplete_serializer_class = serializers.RecipeIngredientSerializer
     queryset = Ingredient.objects.all()
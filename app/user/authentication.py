@@ -0,0 +1,118 @@
+"""
+Token authentication backed by a bounded in-process cache.
+"""
+
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire after ttl seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_tokens = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+def _shared_cache():
+    alias = settings.TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _version_key(key):
+    return f"auth:token:{key}"
+
+
+def _shared_version(shared, key):
+    """Return the token's version in the shared cache, creating one."""
+    version = shared.get(_version_key(key))
+    if version is None:
+        shared.add(_version_key(key), uuid.uuid4().hex, None)
+        version = shared.get(_version_key(key))
+    return version
+
+
+def _forget(key):
+    local_tokens.delete(key)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_version_key(key))
+
+
+def invalidate_token(key):
+    """Forget a cached token in this process and in every other one.
+
+    Repeated after commit, as a lookup in another process may have cached
+    the row as it was before the change became visible.
+    """
+    _forget(key)
+    transaction.on_commit(lambda: _forget(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that caches key -> token (with its user).
+
+    Entries live in a bounded process-local LRU. When TOKEN_CACHE_ALIAS
+    names a shared cache, it holds a version per token (never the user)
+    and a local entry is only used while its version is current, so
+    deleting a token or saving its user, which covers deactivation and
+    password changes, takes effect in all processes at once. Without a
+    shared cache, other processes' entries expire after TOKEN_CACHE_TTL
+    seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = _shared_cache()
+        # Read the version before the database, an invalidation racing
+        # with the lookup then makes the cached entry stale, not valid.
+        version = _shared_version(shared, key) if shared else None
+        cached = local_tokens.get(key)
+        if cached is not None and cached[1] == version:
+            token = cached[0]
+        else:
+            user, token = super().authenticate_credentials(key)
+            local_tokens.set(key, (token, version))
+        # Hand out copies so request code cannot mutate the cached user.
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token.user, token
@@ -1,11 +1,19 @@
 # Tests for user API.
-from django.test import TestCase
+from unittest.mock import patch
+
+import msgpack
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from user.authentication import TTLCache
+
 
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
@@ -72,6 +80,22 @@ class PublicUserAPITest(TestCase):
         self.assertIn("token", res.data)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_token_created_msgpack(self):
+        create_user(email="test@example.com", password="testpass123")
+        body = msgpack.packb(
+            {"email": "test@example.com", "password": "testpass123"}
+        )
+
+        res = self.client.post(
+            TOKEN_URL,
+            body,
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn("token", msgpack.unpackb(res.content))
+
     def test_token_not_created_bad_credentials(self):
         payload = {
             "name": "Test name",
@@ -145,3 +169,147 @@ class PrivateUserAPITests(TestCase):
         self.assertEqual(self.user.name, payload["name"])
         self.assertTrue(self.user.check_password(payload["password"]))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email="token@example.com", password="testpass", name="test"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_cached(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data["email"], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_CACHE_ALIAS="default")
+    def test_revoked_in_other_process_rejected(self):
+        self.client.get(ME_URL)
+        # Only a version string is shared, never the user.
+        self.assertIsInstance(
+            caches["default"].get(f"auth:token:{self.token.key}"), str
+        )
+
+        # Another worker deactivates the user: our local entry stays,
+        # only the shared version changes.
+        get_user_model().objects.filter(id=self.user.id).update(
+            is_active=False
+        )
+        caches["default"].delete(f"auth:token:{self.token.key}")
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_CACHE_ALIAS="default")
+    def test_shared_version_hit_skips_database(self):
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_ttl_cache_bounded_and_expiring(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+        cache.ttl = -1
+        cache.set("d", 4)
+        self.assertIsNone(cache.get("d"))
+
+
+class LoginHardeningTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.credentials = {
+            "email": "login@example.com",
+            "password": "testpass123",
+        }
+        caches["throttle"].clear()
+        self.addCleanup(caches["throttle"].clear)
+
+    def test_login_rehashes_with_new_cost(self):
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            user = create_user(**self.credentials)
+        self.assertIn("$1000$", user.password)
+
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            res = self.client.post(TOKEN_URL, self.credentials)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIn("$2000$", user.password)
+        self.assertTrue(user.check_password(self.credentials["password"]))
+
+    @override_settings(
+        LOGIN_THROTTLE_RATES={"login_ip": "100/min", "login_email": "2/min"}
+    )
+    @patch("user.serializers.authenticate", return_value=None)
+    def test_login_throttled_per_email(self, mock_authenticate):
+        payload = {"email": "Login@example.com", "password": "bad"}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        payload["email"] = "login@example.com"
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(mock_authenticate.call_count, 2)
+
+        payload["email"] = "other@example.com"
+        res = self.client.post(TOKEN_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_with_non_object_body(self):
+        res = self.client.post(TOKEN_URL, [1, 2], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(
+        LOGIN_THROTTLE_RATES={"login_ip": "2/min", "login_email": "100/min"}
+    )
+    @patch("user.serializers.authenticate", return_value=None)
+    def test_login_throttled_per_ip(self, mock_authenticate):
+        for i in range(2):
+            payload = {"email": f"user{i}@example.com", "password": "bad"}
+            self.client.post(TOKEN_URL, payload)
+
+        payload = {"email": "user9@example.com", "password": "bad"}
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(mock_authenticate.call_count, 2)
@@ -0,0 +1,42 @@
+"""
+Throttles for the token (login) endpoint.
+
+They run before the serializer validates credentials, so requests over
+the limit are rejected without paying for a password hash.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginRateThrottle(SimpleRateThrottle):
+    cache = caches[settings.LOGIN_THROTTLE_CACHE_ALIAS]
+
+    def get_rate(self):
+        return settings.LOGIN_THROTTLE_RATES[self.scope]
+
+
+class LoginIPRateThrottle(LoginRateThrottle):
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class LoginEmailRateThrottle(LoginRateThrottle):
+    scope = "login_email"
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, dict):
+            return None
+        email = request.data.get("email")
+        if not email:
+            return None
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": str(email).strip().lower(),
+        }
@@ -1,7 +1,9 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from . import serializers
+from .authentication import CachedTokenAuthentication
+from .throttling import LoginEmailRateThrottle, LoginIPRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -11,11 +13,13 @@ class CreateUserView(generics.CreateAPIView):
 class TokenView(ObtainAuthToken):
     serializer_class = serializers.TokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    throttle_classes = [LoginIPRateThrottle, LoginEmailRateThrottle]
 
 
 class RetrieveUser(generics.RetrieveUpdateAPIView):
     serializer_class = serializers.UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):